@@ -188,35 +188,36 @@ def main() -> None:
         config = yaml.safe_load(fp)
         config = Config.model_validate(config)
 
-    vectorstore = CodeVectorStore(
+    # Closed once the script run is over, Streamlit runs main again on every interaction
+    with CodeVectorStore(
         tenant=config.data.tenant,
         code_encoder=config.data.code_encoder,
         text_encoder=config.data.dense_encoder,
         host=settings.qdrant_host,
         port=settings.qdrant_port,
         cache_dir=config.data.cache_dir,
-    )
-    jira = JiraIssueManager(server=settings.jira_server, token=str(settings.jira_token))
+    ) as vectorstore:
+        jira = JiraIssueManager(server=settings.jira_server, token=str(settings.jira_token))
 
-    agent = create_agent(config=config.agent)
+        agent = create_agent(config=config.agent)
 
-    @lru_cache
-    @agent.system_prompt()
-    def add_repos() -> str:
-        repos = vectorstore.get_all_repos()
-        logger.info(repos)
+        @lru_cache
+        @agent.system_prompt()
+        def add_repos() -> str:
+            repos = vectorstore.get_all_repos()
+            logger.info(repos)
 
-        return f"The repositories you have access to are: {', '.join(repos)}.\n"
+            return f"The repositories you have access to are: {', '.join(repos)}.\n"
 
-    tool_config = config.agent.tools.search.model_dump() | config.agent.tools.jira.model_dump()
-    tool_context = ToolContext(
-        vectorstore=vectorstore,
-        jira_client=jira,
-        **tool_config,
-    )
+        tool_config = config.agent.tools.search.model_dump() | config.agent.tools.jira.model_dump()
+        tool_context = ToolContext(
+            vectorstore=vectorstore,
+            jira_client=jira,
+            **tool_config,
+        )
 
-    chat_app = ChatApp(agent, tool_context)
-    chat_app.run()
+        chat_app = ChatApp(agent, tool_context)
+        chat_app.run()
 
 
 if __name__ == "__main__":
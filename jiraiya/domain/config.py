@@ -9,6 +9,9 @@ class DataConfig(BaseModel):
     blacklist: list[str] = []
     reset: bool = False
     cache_dir: str | None = None
+    # SQLite file keeping extraction and reference results between runs, so files left unchanged are not parsed
+    # again. References are reused while the codebase defines the same symbols.
+    extraction_cache: str | None = None
 
 
 # TODO: split this config
@@ -6,11 +6,12 @@ from tqdm import tqdm
 
 from jiraiya.agent.components import create_docs_writer
 from jiraiya.domain.config import Config
-from jiraiya.domain.data import TextData
+from jiraiya.domain.data import CodeData, TextData
 from jiraiya.domain.documentation import TechnicalDoc
 from jiraiya.indexing.code_parser import CodeBaseParser
+from jiraiya.indexing.extraction_cache import ExtractionCache
 from jiraiya.settings import Settings
-from jiraiya.store.code_store import CodeVectorStore
+from jiraiya.store.code_store import UPSERT_BATCH_SIZE, CodeVectorStore
 
 logging.basicConfig(level=logging.INFO)
 logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -36,49 +37,70 @@ if __name__ == "__main__":
         vectorstore.clear()
 
     writer = create_docs_writer(config.agent)
+    extraction_cache = ExtractionCache(Path(config.data.extraction_cache)) if config.data.extraction_cache else None
 
-    for codebase_path in config.data.codebases:
-        path = Path(codebase_path)
-        log.info("Starting with codebase %s", codebase_path)
+    try:
+        for codebase_path in config.data.codebases:
+            path = Path(codebase_path)
+            log.info("Starting with codebase %s", codebase_path)
 
-        code_parser = CodeBaseParser(codebase_path=path, blacklist=config.data.blacklist)
-
-        for file, _ in code_parser.source_files:
-            log.info(file)
-
-        # Extract classes and top level functions from the codebase
-        data = code_parser.extract_ast_nodes()
-        data = code_parser.resolve_references(data)
-
-        # Generate documentation for each code object
-        for dp in tqdm(data, total=len(data)):
-            response = writer.run_sync(user_prompt=dp.source_code)
-            output: TechnicalDoc = response.output
-
-            text = TextData(
-                repo=dp.repo,
-                name=dp.name,
-                file_path=dp.file_path,
-                text=output.to_markdown(path=str(dp.file_path)),
+            code_parser = CodeBaseParser(
+                codebase_path=path, blacklist=config.data.blacklist, extraction_cache=extraction_cache
             )
 
-            vectorstore.add_code(data=dp)
-            vectorstore.add_text(data=text)
-
-        # Add markdown documents and shell scripts
-        special_files = list(path.rglob("*.md")) + list(path.rglob("*.sh"))
-        md_template = "File: {file_path}\n\nContent:\n{content}"
-
-        if special_files:
-            log.info(special_files)
-            for file in tqdm(special_files, total=len(special_files)):
-                content = file.read_text(encoding="utf-8")
-                text = TextData(
-                    repo=path.name,
-                    name=file.name,
-                    file_path=file,
-                    text=md_template.format(file_path=file, content=content),
+            for file, _ in code_parser.source_files:
+                log.info(file)
+
+            # Extract classes and top level functions from the codebase
+            data = code_parser.extract_ast_nodes()
+            data = code_parser.resolve_references(data)
+            # Parse trees are not needed past this point
+            code_parser.parse_cache.clear()
+
+            # Generate documentation for each code object, storing code and docs a batch at a time
+            codes: list[CodeData] = []
+            texts: list[TextData] = []
+            for dp in tqdm(data, total=len(data)):
+                response = writer.run_sync(user_prompt=dp.source_code)
+                output: TechnicalDoc = response.output
+
+                codes.append(dp)
+                texts.append(
+                    TextData(
+                        repo=dp.repo,
+                        name=dp.name,
+                        file_path=dp.file_path,
+                        text=output.to_markdown(path=str(dp.file_path)),
+                    )
                 )
-                vectorstore.add_text(data=text)
 
-        log.info("Added %d documents to vector store", len(data) + len(special_files))
+                if len(codes) == UPSERT_BATCH_SIZE:
+                    vectorstore.add_code_batch(codes)
+                    vectorstore.add_text_batch(texts)
+                    codes, texts = [], []
+
+            vectorstore.add_code_batch(codes)
+            vectorstore.add_text_batch(texts)
+
+            # Add markdown documents and shell scripts
+            special_files = list(path.rglob("*.md")) + list(path.rglob("*.sh"))
+            md_template = "File: {file_path}\n\nContent:\n{content}"
+
+            if special_files:
+                log.info(special_files)
+                texts = [
+                    TextData(
+                        repo=path.name,
+                        name=file.name,
+                        file_path=file,
+                        text=md_template.format(file_path=file, content=file.read_text(encoding="utf-8")),
+                    )
+                    for file in tqdm(special_files, total=len(special_files))
+                ]
+                vectorstore.add_text_batch(texts)
+
+            log.info("Added %d documents to vector store", len(data) + len(special_files))
+    finally:
+        vectorstore.close()
+        if extraction_cache is not None:
+            extraction_cache.close()
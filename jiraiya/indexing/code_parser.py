@@ -1,17 +1,21 @@
 import ast
 import logging
-from collections import defaultdict
+from collections import defaultdict, deque
 from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import ClassVar
 
 from pathspec import PathSpec
-from tree_sitter import Node
-from tree_sitter_language_pack import SupportedLanguage, get_parser
+from tree_sitter import Node, Tree
+from tree_sitter_language_pack import SupportedLanguage
 
 from jiraiya.domain.data import CodeData
+from jiraiya.indexing.extraction_cache import ExtractionCache
 from jiraiya.indexing.kotlin_reference_detector import KotlinReferenceDetector
+from jiraiya.indexing.parse_cache import ParseCache
 from jiraiya.indexing.python_reference_detector import PythonReferenceDetector
+from jiraiya.indexing.utils import get_kind_ids, get_query, iter_tree
 
 log = logging.getLogger(__name__)
 
@@ -24,15 +28,47 @@ FILE_EXTENSION_LANGUAGE_MAP: dict[str, SupportedLanguage] = {
 
 BLACKLIST = [".venv", "venv", ".git"]
 
+# Top-level directories of the default blacklist, rejected with a set lookup before any pattern matching
+IGNORED_DIR_NAMES = frozenset(BLACKLIST)
+
+# Captures classes, functions and the decorators/annotations preceding a definition in a single pass.
+# Languages without an entry fall back to walking the tree in Python.
+AST_QUERIES: dict[SupportedLanguage, str] = {
+    "python": """
+        (class_definition) @class
+        (function_definition) @method
+        (decorated_definition (decorator) @decorator definition: (_) @decorated)
+    """,
+    "kotlin": """
+        (class_declaration) @class
+        (function_declaration) @method
+        ((annotation) @decorator . [(class_declaration) (function_declaration)] @decorated)
+    """,
+}
+
 
 class CodeBaseParser:
     CLASS_NODE_TYPES: ClassVar = {"class_definition", "class_declaration"}
     METHOD_NODE_TYPES: ClassVar = {"function_definition", "method_declaration", "function_declaration"}
-
-    def __init__(self, codebase_path: Path, *, blacklist: list | None = None, preload: bool = True) -> None:
+    # Number of files read and parsed in the background ahead of the one being extracted
+    read_ahead: int = 8
+
+    def __init__(
+        self,
+        codebase_path: Path,
+        *,
+        blacklist: list | None = None,
+        preload: bool = True,
+        parse_cache: ParseCache | None = None,
+        extraction_cache: ExtractionCache | None = None,
+    ) -> None:
         self.codebase_path = codebase_path
         self.repo = codebase_path.name
         self.blacklist = (blacklist or []) + BLACKLIST
+        # Parse trees are kept for the reference pass, which then does not read and parse every file again
+        self.parse_cache = parse_cache or ParseCache()
+        # Optional results of previous runs for both passes, files whose content did not change are not parsed again
+        self.extraction_cache = extraction_cache
 
         if preload:
             self.source_files = self.load_files(codebase_path)
@@ -55,6 +91,11 @@ class CodeBaseParser:
 
     def _should_include_file(self, path: Path, spec: PathSpec | None) -> bool:
         rel_path = path.relative_to(self.codebase_path)
+
+        # Rule 0: skip the default blacklisted directories with a single set lookup
+        if rel_path.parts[0] in IGNORED_DIR_NAMES:
+            return False
+
         rel_str = str(rel_path)
 
         # Rule 1: skip if matched by blacklist
@@ -73,21 +114,55 @@ class CodeBaseParser:
         return True
 
     def extract_ast_nodes(self) -> list[CodeData]:
-        data: list[CodeData] = []
-        files_by_language = self._group_files_by_language(self.source_files)
-
-        for language, files in files_by_language.items():
-            parser = get_parser(language)
-            for file_path in files:
-                code = file_path.read_text(encoding="utf-8")
-                tree = parser.parse(code.encode("utf-8"))
-                root_node = tree.root_node
+        return list(self.iter_ast_nodes())
 
-                class_nodes, method_nodes = self._extract_class_and_method_nodes(root_node)
-
-                data.extend(self._process_class_nodes(class_nodes, file_path, code))
-                data.extend(self._process_method_nodes(method_nodes, file_path, code))
+    def iter_ast_nodes(self) -> Iterator[CodeData]:
+        """
+        Yield the classes and standalone functions of the codebase file by file.
+        Results are produced per file, and parse trees are only retained up to the parse cache's bound.
+        """
+        files_by_language = self._group_files_by_language(self.source_files)
+        files = [(language, file_path) for language, paths in files_by_language.items() for file_path in paths]
+
+        # Disk reads of the next files overlap the extraction of the current one, which is handed their result
+        with ThreadPoolExecutor(max_workers=self.read_ahead) as executor:
+            pending: deque[Future[tuple[bytes, Tree | None]]] = deque()
+            for index, (language, file_path) in enumerate(files):
+                for ahead_language, ahead_path in files[index + len(pending) : index + self.read_ahead + 1]:
+                    pending.append(executor.submit(self._read_file, ahead_language, ahead_path))
+                # Surfaces read and parse errors of this file
+                code, tree = pending.popleft().result()
+                yield from self._extract_file_nodes(language, file_path, code, tree)
+
+    def _read_file(self, language: SupportedLanguage, file_path: Path) -> tuple[bytes, Tree | None]:
+        """Read a file, and parse it unless its extraction results may be cached."""
+        if self.extraction_cache is None:
+            return self.parse_cache.get_tree(file_path, language)
+        return self.parse_cache.get_source(file_path), None
+
+    def _extract_file_nodes(
+        self, language: SupportedLanguage, file_path: Path, code: bytes, tree: Tree | None
+    ) -> list[CodeData]:
+        rel_path = file_path.relative_to(self.codebase_path)
+        if self.extraction_cache is not None:
+            cached = self.extraction_cache.get(self.repo, rel_path, code)
+            if cached is not None:
+                return cached
+
+        if tree is None:
+            _, tree = self.parse_cache.get_tree(file_path, language, source=code)
+        root_node = tree.root_node
+
+        if language in AST_QUERIES:
+            class_nodes, method_nodes, annotations = self._query_class_and_method_nodes(language, root_node)
+        else:
+            class_nodes, method_nodes = self._extract_class_and_method_nodes(language, root_node)
+            annotations = None
 
+        data = self._process_class_nodes(class_nodes, rel_path, code, annotations)
+        data.extend(self._process_method_nodes(method_nodes, rel_path, code, annotations))
+        if self.extraction_cache is not None:
+            self.extraction_cache.put(self.repo, rel_path, code, data)
         return data
 
     def _group_files_by_language(
@@ -98,39 +173,72 @@ class CodeBaseParser:
             files_by_language[language].append(file_path)
         return files_by_language
 
-    def _extract_class_and_method_nodes(self, root_node: Node) -> tuple[list[Node], list[Node]]:
+    def _query_class_and_method_nodes(
+        self, language: SupportedLanguage, root_node: Node
+    ) -> tuple[list[Node], list[Node], dict[int, list[Node]]]:
+        """
+        Collect class nodes, standalone function nodes and the decorators attached to each definition
+        (keyed by node id) with a single query over the tree.
+        """
+        query = get_query(language, AST_QUERIES[language])
+
+        class_nodes: list[Node] = []
+        method_nodes: list[Node] = []
+        annotations: dict[int, list[Node]] = defaultdict(list)
+        for _, captures in query.matches(root_node):
+            class_nodes.extend(captures.get("class", []))
+            method_nodes.extend(captures.get("method", []))
+            for decorated in captures.get("decorated", []):
+                annotations[decorated.id].extend(captures["decorator"])
+
+        # Matches are not guaranteed to be in document order
+        class_nodes.sort(key=lambda node: node.start_byte)
+        method_nodes.sort(key=lambda node: node.start_byte)
+        for decorators in annotations.values():
+            decorators.sort(key=lambda node: node.start_byte)
+
+        standalone_function_nodes = [node for node in method_nodes if not self._is_inside_class(language, node)]
+        return class_nodes, standalone_function_nodes, annotations
+
+    def _is_inside_class(self, language: SupportedLanguage, node: Node) -> bool:
+        class_kind_ids = get_kind_ids(language, *self.CLASS_NODE_TYPES)
+        parent = node.parent
+        while parent:
+            if parent.kind_id in class_kind_ids:
+                return True
+            parent = parent.parent
+        return False
+
+    def _extract_class_and_method_nodes(
+        self, language: SupportedLanguage, root_node: Node
+    ) -> tuple[list[Node], list[Node]]:
         class_nodes: list[Node] = []
         standalone_function_nodes: list[Node] = []
+        # Compare integer kind ids rather than building a type string for every node
+        class_kind_ids = get_kind_ids(language, *self.CLASS_NODE_TYPES)
+        method_kind_ids = get_kind_ids(language, *self.METHOD_NODE_TYPES)
 
-        def walk(node: Node, *, inside_class: bool = False) -> None:
-            if node.type in self.CLASS_NODE_TYPES:
+        # Walk with a TreeCursor, nested functions are kept unless a class encloses them
+        for node in iter_tree(root_node):
+            if node.kind_id in class_kind_ids:
                 class_nodes.append(node)
-                # When entering a class, set inside_class=True
-                for child in node.children:
-                    walk(child, inside_class=True)
-            elif node.type in self.METHOD_NODE_TYPES:
-                if not inside_class:
-                    standalone_function_nodes.append(node)
-                # Continue walking even from standalone functions
-                for child in node.children:
-                    walk(child, inside_class=inside_class)
-            else:
-                for child in node.children:
-                    walk(child, inside_class=inside_class)
+            elif node.kind_id in method_kind_ids and not self._is_inside_class(language, node):
+                standalone_function_nodes.append(node)
 
-        walk(root_node)
         return class_nodes, standalone_function_nodes
 
-    def _process_class_nodes(self, class_nodes: list[Node], file_path: Path, code: str) -> list[CodeData]:
+    def _process_class_nodes(
+        self, class_nodes: list[Node], rel_path: Path, code: bytes, annotations: dict[int, list[Node]] | None = None
+    ) -> list[CodeData]:
         processed = []
         for class_node in class_nodes:
-            full_source = self._get_full_source_with_annotations(class_node, code)
+            full_source = self._get_full_source_with_annotations(class_node, code, annotations)
             name = self._extract_name(class_node)
             processed.append(
                 CodeData(
                     type="class",
                     repo=self.repo,
-                    file_path=file_path.relative_to(self.codebase_path),
+                    file_path=rel_path,
                     name=name,
                     source_code=full_source,
                     docstring=self._extract_docstring(class_node, code),
@@ -138,17 +246,19 @@ class CodeBaseParser:
             )
         return processed
 
-    def _process_method_nodes(self, method_nodes: list[Node], file_path: Path, code: str) -> list[CodeData]:
+    def _process_method_nodes(
+        self, method_nodes: list[Node], rel_path: Path, code: bytes, annotations: dict[int, list[Node]] | None = None
+    ) -> list[CodeData]:
         processed = []
         for method_node in method_nodes:
             name = self._extract_name(method_node)
             if name:
-                full_source = self._get_full_source_with_annotations(method_node, code)
+                full_source = self._get_full_source_with_annotations(method_node, code, annotations)
                 processed.append(
                     CodeData(
                         type="function",
                         repo=self.repo,
-                        file_path=file_path.relative_to(self.codebase_path),
+                        file_path=rel_path,
                         name=name,
                         source_code=full_source,
                         docstring=self._extract_docstring(method_node, code),
@@ -156,7 +266,7 @@ class CodeBaseParser:
                 )
         return processed
 
-    def _extract_docstring(self, node: Node, code: str) -> str:
+    def _extract_docstring(self, node: Node, code: bytes) -> str:
         # Look into the body block for a string literal
         body_node = node.child_by_field_name("body")
         if body_node:
@@ -164,7 +274,7 @@ class CodeBaseParser:
                 if child.type == "expression_statement" and child.children:
                     expr = child.children[0]
                     if expr.type == "string":
-                        raw_docstring = code[expr.start_byte : expr.end_byte]
+                        raw_docstring = code[expr.start_byte : expr.end_byte].decode("utf-8")
                         return ast.literal_eval(raw_docstring)  # Unescape Python string
         return ""
 
@@ -181,7 +291,7 @@ class CodeBaseParser:
 
         return name_node.text.decode() if name_node else ""
 
-    def _find_annotations_for_node(self, target_node: Node, code: str) -> list[str]:
+    def _find_annotations_for_node(self, target_node: Node, code: bytes) -> list[str]:
         """
         Find decorators/annotations that precede a function or method node.
         Returns a list of annotation strings (e.g., ['@contextmanager', '@lru_cache(maxsize=128)']).
@@ -209,17 +319,31 @@ class CodeBaseParser:
             child = parent.children[i]
 
             if child.type in ["decorator", "annotation"]:
-                decorator_text = code[child.start_byte : child.end_byte].strip()
-                annotations.insert(0, decorator_text)  # Insert at beginning to maintain order
-            elif child.type not in ["comment", "line_comment", "block_comment"] and child.text.decode().strip():
+                decorator_text = code[child.start_byte : child.end_byte].decode("utf-8").strip()
+                annotations.append(decorator_text)
+            elif (
+                child.type not in ["comment", "line_comment", "block_comment"]
+                and code[child.start_byte : child.end_byte].strip()
+            ):
                 break
 
+        # Collected walking backwards, restore source order
+        annotations.reverse()
         return annotations
 
-    def _get_full_source_with_annotations(self, node: Node, code: str) -> str:
-        """Get the complete source code for a method including its decorators/annotations."""
-        annotations = self._find_annotations_for_node(node, code)
-        source = code[node.start_byte : node.end_byte]
+    def _get_full_source_with_annotations(
+        self, node: Node, code: bytes, annotations_by_node: dict[int, list[Node]] | None = None
+    ) -> str:
+        """
+        Get the complete source code for a method including its decorators/annotations.
+        Uses the decorators collected by the query when available, otherwise scans the preceding siblings.
+        """
+        if annotations_by_node is None:
+            annotations = self._find_annotations_for_node(node, code)
+        else:
+            decorators = annotations_by_node.get(node.id, [])
+            annotations = [code[child.start_byte : child.end_byte].decode("utf-8").strip() for child in decorators]
+        source = code[node.start_byte : node.end_byte].decode("utf-8")
 
         if annotations:
             # Join annotations with newlines and add the method source
@@ -234,9 +358,13 @@ class CodeBaseParser:
 
         for language, files in files_by_language.items():
             if language == "python":
-                detector = PythonReferenceDetector(self.codebase_path, files)
+                detector = PythonReferenceDetector(
+                    self.codebase_path, files, parse_cache=self.parse_cache, extraction_cache=self.extraction_cache
+                )
             elif language == "kotlin":
-                detector = KotlinReferenceDetector(self.codebase_path, files)
+                detector = KotlinReferenceDetector(
+                    self.codebase_path, files, parse_cache=self.parse_cache, extraction_cache=self.extraction_cache
+                )
             else:
                 raise NotImplementedError
 
@@ -0,0 +1,105 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+from pydantic import ConfigDict, TypeAdapter
+
+from jiraiya.domain.data import CodeData, ReferenceType
+
+# Bump when the extraction or reference detection output changes, so results of older versions are dropped
+CACHE_VERSION = 2
+
+# A reference found in a file, with its target by qualified name: target, type, line, column and undecoded text
+CachedReference = tuple[str, ReferenceType, int, int, bytes]
+
+_CODE_DATA_LIST = TypeAdapter(list[CodeData])
+# Node texts are kept undecoded, base64 round-trips any bytes through JSON
+_REFERENCES = TypeAdapter(list[CachedReference], config=ConfigDict(ser_json_bytes="base64", val_json_bytes="base64"))
+
+
+class ExtractionCache:
+    """
+    Classes and functions extracted from each file, and the references found in it, persisted in SQLite across
+    indexing runs and keyed by the file's content hash, so files unchanged since a previous run are neither
+    parsed nor walked again. References also depend on the symbols they resolve to, and are only reused while
+    the codebase defines the same symbols. Parse trees themselves cannot be serialized, the extraction and
+    detection results are what the cache stores.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+        (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+        if version != CACHE_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS extraction_cache")
+            self._connection.execute("DROP TABLE IF EXISTS reference_cache")
+            self._connection.execute(f"PRAGMA user_version={CACHE_VERSION}")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS extraction_cache "
+            "(repo TEXT, path TEXT, hash BLOB, data TEXT, PRIMARY KEY (repo, path))"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS reference_cache "
+            "(repo TEXT, path TEXT, hash BLOB, symbols BLOB, data TEXT, PRIMARY KEY (repo, path))"
+        )
+        self._connection.commit()
+
+    def get(self, repo: str, rel_path: Path, code: bytes) -> list[CodeData] | None:
+        """Return the extraction results of a file, or None if it was not extracted with this content."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM extraction_cache WHERE repo = ? AND path = ? AND hash = ?",
+                (repo, str(rel_path), self._hash(code)),
+            ).fetchone()
+        return _CODE_DATA_LIST.validate_json(row[0]) if row else None
+
+    def put(self, repo: str, rel_path: Path, code: bytes, data: list[CodeData]) -> None:
+        """Store the extraction results of a file, replacing those of its previous content."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO extraction_cache VALUES (?, ?, ?, ?)",
+                (repo, str(rel_path), self._hash(code), _CODE_DATA_LIST.dump_json(data)),
+            )
+
+    def get_references(self, repo: str, rel_path: Path, code: bytes, symbols: bytes) -> list[CachedReference] | None:
+        """
+        Return the references found in a file, or None if they were not detected with this content
+        against the symbols identified by the `symbols` digest.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM reference_cache WHERE repo = ? AND path = ? AND hash = ? AND symbols = ?",
+                (repo, str(rel_path), self._hash(code), symbols),
+            ).fetchone()
+        return _REFERENCES.validate_json(row[0]) if row else None
+
+    def put_references(
+        self, repo: str, rel_path: Path, code: bytes, symbols: bytes, references: list[CachedReference]
+    ) -> None:
+        """Store the references found in a file, replacing those of its previous content or symbols."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO reference_cache VALUES (?, ?, ?, ?, ?)",
+                (repo, str(rel_path), self._hash(code), symbols, _REFERENCES.dump_json(references)),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def symbols_digest(symbols: list[tuple[str, Path]]) -> bytes:
+        """Digest of the (qualified name, defining file) pairs references were resolved against."""
+        digest = hashlib.blake2b(digest_size=16)
+        for qualified_name, file_path in sorted(symbols):
+            digest.update(f"{qualified_name}\0{file_path}\n".encode())
+        return digest.digest()
+
+    @staticmethod
+    def _hash(code: bytes) -> bytes:
+        return hashlib.blake2b(code, digest_size=16).digest()
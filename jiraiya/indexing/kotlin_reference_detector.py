@@ -1,15 +1,57 @@
-from collections.abc import Iterator
+from collections.abc import Callable, Iterator, Mapping
 from pathlib import Path
+from typing import ClassVar
 
 from tree_sitter import Node
 
 from jiraiya.domain.data import CodeData, ReferenceType
+from jiraiya.indexing.extraction_cache import ExtractionCache
+from jiraiya.indexing.parse_cache import ParseCache
 from jiraiya.indexing.reference_detector_base import ReferenceDetector
+from jiraiya.indexing.utils import get_kind_ids, node_text
+
+# Node kind ids compared by the handlers below, resolved once from the grammar
+IDENTIFIER = get_kind_ids("kotlin", "identifier")
+IMPORT_ALIAS = get_kind_ids("kotlin", "import_alias")
+WILDCARD_IMPORT = get_kind_ids("kotlin", "wildcard_import")
+CALL_EXPRESSION = get_kind_ids("kotlin", "call_expression")
+NAVIGATION_EXPRESSION = get_kind_ids("kotlin", "navigation_expression")
+ANNOTATION = get_kind_ids("kotlin", "annotation")
+PROPERTY_DECLARATION = get_kind_ids("kotlin", "property_declaration")
+ASSIGNMENT = get_kind_ids("kotlin", "assignment")
+CONSTRUCTOR_INVOCATION = get_kind_ids("kotlin", "constructor_invocation")
+TYPE_IDENTIFIER = get_kind_ids("kotlin", "type_identifier")
+USER_TYPE = get_kind_ids("kotlin", "user_type")
+SIMPLE_IDENTIFIER = get_kind_ids("kotlin", "simple_identifier")
+INHERITANCE_SPECIFIERS = CONSTRUCTOR_INVOCATION | TYPE_IDENTIFIER | USER_TYPE
+NAMED_TYPES = TYPE_IDENTIFIER | USER_TYPE
+CALLEES = SIMPLE_IDENTIFIER | NAVIGATION_EXPRESSION
+ANNOTATION_NAMES = USER_TYPE | SIMPLE_IDENTIFIER
+ANNOTATION_ARGUMENTS = USER_TYPE | SIMPLE_IDENTIFIER | CONSTRUCTOR_INVOCATION
+TYPE_ANNOTATION_PARENTS = get_kind_ids(
+    "kotlin", "value_parameter", "variable_declaration", "type_reference", "user_type"
+)
 
 
 class KotlinReferenceDetector(ReferenceDetector):
-    def __init__(self, codebase_path: Path, files: list[Path]) -> None:
-        super().__init__(codebase_path, files)
+    identifier_kinds: ClassVar[tuple[str, ...]] = ("simple_identifier", "type_identifier")
+
+    def __init__(
+        self,
+        codebase_path: Path,
+        files: list[Path],
+        *,
+        parse_cache: ParseCache | None = None,
+        extraction_cache: ExtractionCache | None = None,
+        imports_context_provider: Callable[[Node], Mapping[str, str]] | None = None,
+    ) -> None:
+        super().__init__(
+            codebase_path,
+            files,
+            parse_cache=parse_cache,
+            extraction_cache=extraction_cache,
+            imports_context_provider=imports_context_provider,
+        )
         self._language = "kotlin"
 
         self.node_handlers = {
@@ -32,33 +74,24 @@ class KotlinReferenceDetector(ReferenceDetector):
         """
         imports_map = {}
 
-        def walk_imports(node: Node) -> None:
-            if node.type == "import_header":
-                import_text = node.text.decode().strip()
-                # Remove the "import" keyword
-                if import_text.startswith("import "):
-                    import_body = import_text[len("import ") :].strip()
-
-                    # Handle alias: e.g. import foo.bar.Baz as BazAlias
-                    if " as " in import_body:
-                        qualified_name, alias = map(str.strip, import_body.split(" as ", 1))
-                        simple_name = alias
-                    else:
-                        qualified_name = import_body
-                        # Handle wildcard imports
-                        if qualified_name.endswith(".*"):
-                            # For wildcard imports, we can't resolve simple names
-                            # but we could store the package for later resolution
-                            pass
-                        else:
-                            # Simple name is the last segment of qualified name
-                            simple_name = qualified_name.split(".")[-1]
-                            imports_map[simple_name] = qualified_name
-
-            for child in node.children:
-                walk_imports(child)
+        imports = self._get_query("(import_header) @import").captures(root_node).get("import", [])
+        for node in sorted(imports, key=lambda node: node.start_byte):
+            # Read the segments parsed by tree-sitter: import foo.bar.Baz [as BazAlias] or import foo.bar.*
+            qualified_name = alias = None
+            wildcard = False
+            for child in node.named_children:
+                if child.kind_id in IDENTIFIER:
+                    qualified_name = child.text.decode()
+                elif child.kind_id in IMPORT_ALIAS:
+                    alias = child.named_children[-1].text.decode()
+                elif child.kind_id in WILDCARD_IMPORT:
+                    wildcard = True
+
+            # For wildcard imports, we can't resolve simple names
+            if qualified_name and not wildcard:
+                # Simple name is the alias, or else the last segment of the qualified name
+                imports_map[alias or qualified_name.rpartition(".")[2]] = qualified_name
 
-        walk_imports(root_node)
         return imports_map
 
     def _handle_inheritance(
@@ -67,14 +100,14 @@ class KotlinReferenceDetector(ReferenceDetector):
         # In Kotlin: class Foo : Bar()
         for child in node.children:
             for spec in child.children:
-                if spec.type in ("constructor_invocation", "type_identifier", "user_type"):
+                if spec.kind_id in INHERITANCE_SPECIFIERS:
                     # Handle different inheritance patterns
-                    if spec.type == "constructor_invocation":
+                    if spec.kind_id in CONSTRUCTOR_INVOCATION:
                         name = spec.text.decode().rstrip("()")
                         code_data = self._resolve_reference_target(name, qualified_name_to_code_data, imports_context)
                         if code_data:
                             yield code_data
-                    elif spec.type in ("type_identifier", "user_type"):
+                    elif spec.kind_id in NAMED_TYPES:
                         name = spec.text.decode()
                         code_data = self._resolve_reference_target(name, qualified_name_to_code_data, imports_context)
                         if code_data:
@@ -84,10 +117,10 @@ class KotlinReferenceDetector(ReferenceDetector):
         self, node: Node, qualified_name_to_code_data: dict[str, CodeData], imports_context: dict[str, str]
     ) -> Iterator[CodeData]:
         # Handle different call patterns
-        if node.type == "call_expression":
+        if node.kind_id in CALL_EXPRESSION:
             # Get the function being called
             for child in node.children:
-                if child.type in ("simple_identifier", "navigation_expression"):
+                if child.kind_id in CALLEES:
                     name = child.text.decode()
                     code_data = self._resolve_reference_target(name, qualified_name_to_code_data, imports_context)
                     if code_data:
@@ -99,17 +132,17 @@ class KotlinReferenceDetector(ReferenceDetector):
         qualified_name_to_code_data: dict[str, CodeData],
         imports_context: dict[str, str],
     ) -> Iterator[CodeData]:
-        parent_type = node.parent.type if node.parent else None
+        parent = node.parent
         # user_type makes TYPE_ANNOTATION a bit too eager, but removing it makes it miss when needed
-        if parent_type in ("value_parameter", "variable_declaration", "type_reference", "user_type"):
-            if node.type == "type_identifier":
+        if parent and parent.kind_id in TYPE_ANNOTATION_PARENTS:
+            if node.kind_id in TYPE_IDENTIFIER:
                 identifier = node.text.decode()
                 code_data = self._resolve_reference_target(identifier, qualified_name_to_code_data, imports_context)
                 if code_data:
                     yield code_data
-            elif node.type == "user_type":
+            elif node.kind_id in USER_TYPE:
                 # Handle user-defined types
-                type_identifiers = [child for child in node.children if child.type == "type_identifier"]
+                type_identifiers = [child for child in node.children if child.kind_id in TYPE_IDENTIFIER]
                 if type_identifiers:
                     # Take the first type identifier for the main type
                     identifier = type_identifiers[0].text.decode()
@@ -124,10 +157,10 @@ class KotlinReferenceDetector(ReferenceDetector):
         imports_context: dict[str, str],
     ) -> Iterator[CodeData]:
         # Handle navigation expressions like obj.property
-        if node.type == "navigation_expression":
+        if node.kind_id in NAVIGATION_EXPRESSION:
             # Get the left side of the navigation
             left_node = node.children[0] if node.children else None
-            if left_node and left_node.type == "simple_identifier":
+            if left_node and left_node.kind_id in SIMPLE_IDENTIFIER:
                 base_name = left_node.text.decode()
                 code_data = self._resolve_reference_target(base_name, qualified_name_to_code_data, imports_context)
                 if code_data:
@@ -140,17 +173,17 @@ class KotlinReferenceDetector(ReferenceDetector):
         imports_context: dict[str, str],
     ) -> Iterator[CodeData]:
         # Kotlin annotation: @MyAnnotation
-        if node.type == "annotation":
+        if node.kind_id in ANNOTATION:
             # Find the annotation name
             for child in node.children:
-                if child.type in ("user_type", "simple_identifier"):
+                if child.kind_id in ANNOTATION_NAMES:
                     name = child.text.decode()
                     code_data = self._resolve_reference_target(name, qualified_name_to_code_data, imports_context)
                     if code_data:
                         yield code_data
                 else:
                     for spec in child.children:
-                        if spec.type in ("user_type", "simple_identifier", "constructor_invocation"):
+                        if spec.kind_id in ANNOTATION_ARGUMENTS:
                             name = spec.text.decode()
                             code_data = self._resolve_reference_target(
                                 name, qualified_name_to_code_data, imports_context
@@ -165,14 +198,14 @@ class KotlinReferenceDetector(ReferenceDetector):
         imports_context: dict[str, str],
     ) -> Iterator[CodeData]:
         # Handle assignment expressions
-        if node.type == "assignment":
+        if node.kind_id in ASSIGNMENT:
             # Get the right-hand side of the assignment
             rhs = node.child_by_field_name("right")
             if rhs:
-                if rhs.type == "call_expression":
+                if rhs.kind_id in CALL_EXPRESSION:
                     yield from self._handle_function_call(rhs, qualified_name_to_code_data, imports_context)
-                elif rhs.type in ("simple_identifier", "navigation_expression"):
-                    base_name = rhs.text.decode().split(".")[0]
+                elif rhs.kind_id in CALLEES:
+                    base_name = node_text(rhs).partition(b".")[0].decode()
                     code_data = self._resolve_reference_target(base_name, qualified_name_to_code_data, imports_context)
                     if code_data:
                         yield code_data
@@ -184,16 +217,16 @@ class KotlinReferenceDetector(ReferenceDetector):
         imports_context: dict[str, str],
     ) -> Iterator[CodeData]:
         # Handle property declarations: val foo: MyType = ...
-        if node.type != "property_declaration":
+        if node.kind_id not in PROPERTY_DECLARATION:
             return
 
         # Handle type annotation
         type_node = node.child_by_field_name("type")
         if type_node:
             type_identifiers = []
-            if type_node.type == "user_type":
-                type_identifiers = [child for child in type_node.children if child.type == "type_identifier"]
-            elif type_node.type == "type_identifier":
+            if type_node.kind_id in USER_TYPE:
+                type_identifiers = [child for child in type_node.children if child.kind_id in TYPE_IDENTIFIER]
+            elif type_node.kind_id in TYPE_IDENTIFIER:
                 type_identifiers = [type_node]
 
             for identifier_node in type_identifiers:
@@ -205,10 +238,10 @@ class KotlinReferenceDetector(ReferenceDetector):
         # Handle initializer
         initializer = node.child_by_field_name("initializer")
         if initializer:
-            if initializer.type == "call_expression":
+            if initializer.kind_id in CALL_EXPRESSION:
                 yield from self._handle_function_call(initializer, qualified_name_to_code_data, imports_context)
-            elif initializer.type in ("simple_identifier", "navigation_expression"):
-                base_name = initializer.text.decode().split(".")[0]
+            elif initializer.kind_id in CALLEES:
+                base_name = node_text(initializer).partition(b".")[0].decode()
                 code_data = self._resolve_reference_target(base_name, qualified_name_to_code_data, imports_context)
                 if code_data:
                     yield code_data
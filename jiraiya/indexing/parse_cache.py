@@ -0,0 +1,67 @@
+import threading
+from pathlib import Path
+
+from tree_sitter import Tree
+from tree_sitter_language_pack import SupportedLanguage
+
+from jiraiya.indexing.utils import get_thread_parser
+
+# Source bytes whose trees are kept, trees take several times the size of their source in memory
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class ParseCache:
+    """
+    Source bytes and parse trees keyed by path and checked against (mtime, size), so the symbol extraction
+    and reference passes parse each file only once. Trees are kept while their sources fit in `max_bytes`,
+    and none is evicted for a newer one: both passes visit the files in the same order, so evicting the
+    oldest trees would drop each one before the second pass gets to it. Beyond the budget, files are parsed
+    again by the second pass. Safe to share between threads, each thread parses with its own parsers.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._trees: dict[Path, tuple[tuple[int, int], bytes, Tree]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_tree(self, path: Path, language: SupportedLanguage, source: bytes | None = None) -> tuple[bytes, Tree]:
+        """
+        Return the source and parse tree of a file, parsing it only if it is new or changed on disk.
+        `source` is the content of the file when the caller already read it, so that it is not read again.
+        """
+        stamp = self._stamp(path)
+        with self._lock:
+            cached = self._trees.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1], cached[2]
+
+        code = path.read_bytes() if source is None else source
+        tree = get_thread_parser(language).parse(code)
+
+        with self._lock:
+            # A changed file replaces its outdated tree
+            if (outdated := self._trees.pop(path, None)) is not None:
+                self._size -= len(outdated[1])
+            if self._size + len(code) <= self.max_bytes:
+                self._trees[path] = (stamp, code, tree)
+                self._size += len(code)
+        return code, tree
+
+    def get_source(self, path: Path) -> bytes:
+        """Return the source of a file, taken from the cache if its tree is current, without parsing it."""
+        stamp = self._stamp(path)
+        with self._lock:
+            cached = self._trees.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        return path.read_bytes()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._trees.clear()
+            self._size = 0
+
+    def _stamp(self, path: Path) -> tuple[int, int]:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
@@ -1,15 +1,42 @@
-from collections.abc import Iterator
+from collections.abc import Callable, Iterator, Mapping
 from pathlib import Path
+from typing import ClassVar
 
 from tree_sitter import Node
 
 from jiraiya.domain.data import CodeData, ReferenceType
+from jiraiya.indexing.extraction_cache import ExtractionCache
+from jiraiya.indexing.parse_cache import ParseCache
 from jiraiya.indexing.reference_detector_base import ReferenceDetector
+from jiraiya.indexing.utils import get_kind_ids, iter_tree, node_text
+
+# Node kind ids compared by the import extraction and handlers, resolved once from the grammar
+IMPORT_STATEMENT = get_kind_ids("python", "import_statement")
+IMPORT_FROM_STATEMENT = get_kind_ids("python", "import_from_statement")
+ALIASED_IMPORT = get_kind_ids("python", "aliased_import")
+IDENTIFIER = get_kind_ids("python", "identifier")
+DEFINITIONS = get_kind_ids("python", "class_definition", "function_definition", "method_definition")
 
 
 class PythonReferenceDetector(ReferenceDetector):
-    def __init__(self, codebase_path: Path, files: list[Path]) -> None:
-        super().__init__(codebase_path, files)
+    identifier_kinds: ClassVar[tuple[str, ...]] = ("identifier",)
+
+    def __init__(
+        self,
+        codebase_path: Path,
+        files: list[Path],
+        *,
+        parse_cache: ParseCache | None = None,
+        extraction_cache: ExtractionCache | None = None,
+        imports_context_provider: Callable[[Node], Mapping[str, str]] | None = None,
+    ) -> None:
+        super().__init__(
+            codebase_path,
+            files,
+            parse_cache=parse_cache,
+            extraction_cache=extraction_cache,
+            imports_context_provider=imports_context_provider,
+        )
         self._language = "python"
 
         self.node_handlers = {
@@ -35,40 +62,34 @@ class PythonReferenceDetector(ReferenceDetector):
         """
         imports_map = {}
 
-        def walk_imports(node: Node) -> None:
-            if node.type == "import_statement":
-                # Handle: import module.submodule.ClassName
-                import_text = node.text.decode()
-                if "." in import_text:
-                    # Extract the qualified name and simple name
-                    parts = import_text.replace("import", "").strip().split(".")
-                    if len(parts) >= 2:  # noqa: PLR2004
-                        simple_name = parts[-1]
-                        qualified_name = ".".join(parts)
-                        imports_map[simple_name] = qualified_name
-
-            elif node.type == "import_from_statement":
-                # Handle: from module.submodule import ClassName
-                import_text = node.text.decode()
-                # TODO: Extend to other languages
-                # Parse "from X import Y" or "from X import Y as Z"
-                if "from " in import_text and " import " in import_text:
-                    from_part = import_text.split(" import ")[0].replace("from ", "").strip()
-                    import_part = import_text.split(" import ")[1].strip()
-
-                    # Handle multiple imports or aliases
-                    imported_items = [item.strip() for item in import_part.split(",")]
-                    for item in imported_items:
-                        if " as " in item:
-                            original_name, alias = item.split(" as ")
-                            imports_map[alias.strip()] = f"{from_part}.{original_name.strip()}"
-                        else:
-                            imports_map[item] = f"{from_part}.{item}"
-
-            for child in node.children:
-                walk_imports(child)
-
-        walk_imports(root_node)
+        # Imports may appear anywhere, including inside functions. Captures are sorted back into document
+        # order, so that a later import of a name overrides an earlier one.
+        query = self._get_query("[(import_statement) (import_from_statement)] @import")
+        for node in sorted(query.captures(root_node).get("import", []), key=lambda node: node.start_byte):
+            if node.kind_id in IMPORT_STATEMENT:
+                # Handle: import module.submodule.ClassName [as Alias]
+                for name_node in node.children_by_field_name("name"):
+                    if name_node.kind_id in ALIASED_IMPORT:
+                        alias = node_text(name_node.child_by_field_name("alias")).decode()
+                        imports_map[alias] = node_text(name_node.child_by_field_name("name")).decode()
+                    else:
+                        qualified_name = name_node.text.decode()
+                        if "." in qualified_name:
+                            imports_map[qualified_name.rpartition(".")[2]] = qualified_name
+
+            elif node.kind_id in IMPORT_FROM_STATEMENT:
+                # Handle: from module.submodule import ClassName [as Alias], including relative modules
+                # and parenthesized or continued import lists
+                from_part = node_text(node.child_by_field_name("module_name")).decode()
+                for name_node in node.children_by_field_name("name"):
+                    if name_node.kind_id in ALIASED_IMPORT:
+                        original_name = node_text(name_node.child_by_field_name("name")).decode()
+                        alias = node_text(name_node.child_by_field_name("alias")).decode()
+                        imports_map[alias] = f"{from_part}.{original_name}"
+                    else:
+                        item = name_node.text.decode()
+                        imports_map[item] = f"{from_part}.{item}"
+
         return imports_map
 
     def _handle_inheritance(
@@ -105,10 +126,8 @@ class PythonReferenceDetector(ReferenceDetector):
         function_node = node.child_by_field_name("function")
 
         if function_node:
-            function_text = function_node.text.decode()
-
-            # Extract the base identifier from qualified calls like 'module.Class()'
-            base_identifier = function_text.split(".")[0] if "." in function_text else function_text
+            # Extract the base identifier from qualified calls like 'module.Class()', decoding only that part
+            base_identifier = node_text(function_node).partition(b".")[0].decode()
 
             code_data = self._resolve_reference_target(base_identifier, qualified_name_to_code_data, imports_context)
 
@@ -124,27 +143,13 @@ class PythonReferenceDetector(ReferenceDetector):
         Handle type annotations like 'def func(param: MyClass)'
         or `Annotated[MyClass, Depends(get_my_class)]`.
         """
-        refs = []
-        nodes_to_visit = [node]
-
-        while nodes_to_visit:
-            current = nodes_to_visit.pop()
-            if current.type == "identifier":
+        # Every identifier in the annotation can be a reference, including the function of a call
+        for current in iter_tree(node):
+            if current.kind_id in IDENTIFIER:
                 identifier = current.text.decode()
-                refs.append((identifier, current))
-            elif current.type == "call":
-                if current.children and current.children[0].type == "identifier":
-                    identifier = current.children[0].text.decode()
-                    refs.append((identifier, current.children[0]))
-
-            # Add children to stack to keep exploring recursively
-            nodes_to_visit.extend(current.children)
-
-        # Only take first reference
-        for identifier, _ in refs:
-            code_data = self._resolve_reference_target(identifier, qualified_name_to_code_data, imports_context)
-            if code_data:
-                yield code_data
+                code_data = self._resolve_reference_target(identifier, qualified_name_to_code_data, imports_context)
+                if code_data:
+                    yield code_data
 
     def _handle_attribute_access(
         self,
@@ -153,10 +158,8 @@ class PythonReferenceDetector(ReferenceDetector):
         imports_context: dict[str, str],
     ) -> Iterator[CodeData]:
         """Handle attribute access like 'ClassName.attribute' or 'obj.method'"""
-        attr_text = node.text.decode()
-
-        # Extract the base object/class name
-        base_name = attr_text.split(".")[0]
+        # Extract the base object/class name, decoding only that part
+        base_name = node_text(node).partition(b".")[0].decode()
 
         code_data = self._resolve_reference_target(base_name, qualified_name_to_code_data, imports_context)
         yield code_data
@@ -168,10 +171,8 @@ class PythonReferenceDetector(ReferenceDetector):
         imports_context: dict[str, str],
     ) -> Iterator[CodeData]:
         """Handle decorators like '@ClassName' or '@module.decorator'"""
-        decorator_text = node.text.decode()
-
-        # Extract decorator name (remove @ and handle qualified names)
-        decorator_name = decorator_text.lstrip("@").split("(")[0].split(".")[0]
+        # Extract decorator name (remove @ and handle qualified names), decoding only that part
+        decorator_name = node_text(node).lstrip(b"@").partition(b"(")[0].partition(b".")[0].decode()
 
         code_data = self._resolve_reference_target(decorator_name, qualified_name_to_code_data, imports_context)
         yield code_data
@@ -183,15 +184,8 @@ class PythonReferenceDetector(ReferenceDetector):
         imports_context: dict[str, str],
     ) -> Iterator[CodeData]:
         """Handle assignment expressions like 'var = ClassName' or 'var = ClassName()'"""
-        assignment_value = None
-
-        # Find the right-hand side of the assignment
-        for child in node.children:
-            if child.type in ["=", "assignment_operator"]:
-                operator_index = node.children.index(child)
-                if operator_index + 1 < len(node.children):
-                    assignment_value = node.children[operator_index + 1]
-                    break
+        # The right-hand side of the assignment, absent for bare annotations like 'var: MyClass'
+        assignment_value = node.child_by_field_name("right")
 
         if assignment_value:
             if assignment_value.type == "identifier":
@@ -237,12 +231,8 @@ class PythonReferenceDetector(ReferenceDetector):
 
     def _is_definition_node(self, node: Node) -> bool:
         """Check if this node is part of a definition (to avoid self-references)"""
+        # A node can only be the name field of its own parent, no further ancestor needs checking
         parent = node.parent
-        while parent:
-            if parent.type in ["class_definition", "function_definition", "method_definition"]:
-                # Check if this identifier is the name being defined
-                name_node = parent.child_by_field_name("name")
-                if name_node and name_node == node:
-                    return True
-            parent = parent.parent
-        return False
+        if node.kind_id not in IDENTIFIER or parent is None or parent.kind_id not in DEFINITIONS:
+            return False
+        return parent.child_by_field_name("name") == node
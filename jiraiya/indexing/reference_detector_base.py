@@ -1,26 +1,87 @@
+import os
+import re
+import threading
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
+from typing import ClassVar
 
-from tree_sitter import Node
-from tree_sitter_language_pack import SupportedLanguage, get_parser
+from tree_sitter import Node, Query
+from tree_sitter_language_pack import SupportedLanguage
 
-from jiraiya.domain.data import CodeData, ReferenceData
+from jiraiya.domain.data import CodeData, ReferenceData, ReferenceType
+from jiraiya.indexing.extraction_cache import ExtractionCache
+from jiraiya.indexing.parse_cache import ParseCache
+from jiraiya.indexing.utils import get_kind_ids, get_thread_query, iter_tree, node_text
+
+# Identifies duplicate references to a target: same type, file and line
+ReferenceKey = tuple[ReferenceType, Path, int]
+# A reference found in a file, before deduplication: target, type, file, line, column and undecoded text
+FoundReference = tuple[CodeData, ReferenceType, Path, int, int, bytes]
+# Identifier-like tokens of a source file, treating the bytes of UTF-8 encoded characters as word characters
+TOKEN_PATTERN = re.compile(rb"[\w\x80-\xff]+")
+
+
+class _ThreadState(threading.local):
+    """Resolution caches owned by a single worker thread."""
+
+    def __init__(self) -> None:
+        # Resolved reference targets for the file being processed, keyed by identifier
+        self.resolve_cache: dict[str, CodeData | None] = {}
+        # First segment of every qualified name of the lookup currently being resolved against
+        self.qualified_heads: tuple[dict[str, CodeData] | None, frozenset[bytes]] = (None, frozenset())
+        # Fake imports of the symbols of that lookup, grouped by the file defining them relative to the codebase
+        self.local_symbols: tuple[dict[str, CodeData] | None, dict[Path, list[tuple[str, str]]]] = (None, {})
 
 
 class ReferenceDetector(ABC):
-    def __init__(self, codebase_path: Path, files: list[Path]) -> None:
+    # Number of threads scanning files concurrently, defaults to the number of CPUs
+    max_workers: int | None = None
+    # Kinds of the identifier tokens every resolvable name starts with. When set, files are not walked:
+    # handlers only run on the nodes enclosing an identifier that could resolve.
+    identifier_kinds: ClassVar[tuple[str, ...]] = ()
+
+    def __init__(
+        self,
+        codebase_path: Path,
+        files: list[Path],
+        *,
+        parse_cache: ParseCache | None = None,
+        extraction_cache: ExtractionCache | None = None,
+        imports_context_provider: Callable[[Node], Mapping[str, str]] | None = None,
+    ) -> None:
         self.codebase_path = codebase_path
         self.files = files
+        # Shared with the symbol extraction pass, so files it already parsed are not parsed again
+        self.parse_cache = parse_cache or ParseCache()
+        # Optional references found by previous runs, files whose content and symbols did not change are not parsed
+        self.extraction_cache = extraction_cache
+        self.repo = codebase_path.name
+        # Maps the root node of a file to its imports in place of reading its import statements
+        self.imports_context_provider = imports_context_provider
 
         self._language: SupportedLanguage | None = None
         self.node_handlers = {}
 
+        self._state = _ThreadState()
+
     @property
     def language(self) -> SupportedLanguage:
         if not self._language:
             raise ValueError
         return self._language
 
+    @cached_property
+    def _handlers_by_kind_id(self) -> dict[int, tuple]:
+        """node_handlers keyed by grammar kind id, so dispatch compares ints instead of node type strings."""
+        return {
+            kind_id: handler
+            for kind, handler in self.node_handlers.items()
+            for kind_id in get_kind_ids(self.language, kind)
+        }
+
     def resolve_references(self, data: list[CodeData]) -> dict[str, CodeData]:
         """
         Find all references for each CodeData object across all files in the repo.
@@ -28,44 +89,207 @@ class ReferenceDetector(ABC):
         """
         # Create lookups for efficient searching
         # Key: fully qualified name (module.name), Value: CodeData object
-        qualified_name_to_code_data = {f"{d.module}.{d.name}".lstrip("."): d.model_copy() for d in data}
+        # Not copied: a shallow copy would share the references lists with the originals anyway
+        qualified_name_to_code_data = {f"{d.module}.{d.name}".lstrip("."): d for d in data}
+        symbol_names = frozenset(d.name.encode() for d in data)
+        symbols = (
+            ExtractionCache.symbols_digest([(name, d.file_path) for name, d in qualified_name_to_code_data.items()])
+            if self.extraction_cache is not None
+            else b""
+        )
 
-        # Process each file to find references
-        parser = get_parser(self.language)
-        for file_path in self.files:
-            code = file_path.read_text()
-            tree = parser.parse(code.encode("utf-8"))
-            root_node = tree.root_node
-            self._find_references_in_file(file_path, code, root_node, qualified_name_to_code_data)
+        # Files are parsed and scanned concurrently, their references are merged here in file order
+        seen: dict[int, set[ReferenceKey]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers or os.cpu_count()) as executor:
+            for references in executor.map(
+                lambda file_path: self._process_file(file_path, qualified_name_to_code_data, symbol_names, symbols),
+                self.files,
+            ):
+                self._add_references(references, seen)
 
         return qualified_name_to_code_data
 
+    def _process_file(
+        self,
+        file_path: Path,
+        qualified_name_to_code_data: dict[str, CodeData],
+        symbol_names: frozenset[bytes],
+        symbols: bytes,
+    ) -> list[FoundReference]:
+        """
+        Read, parse and scan a single file, without modifying any CodeData object.
+        `symbols` is the digest of the lookup, under which the references of the file are cached.
+        """
+        # Resolving to a symbol takes its name, spelled out in the file as a reference or an import.
+        # Files mentioning none of the names cannot reference anything and are not parsed.
+        code = self.parse_cache.get_source(file_path)
+        if symbol_names.isdisjoint(TOKEN_PATTERN.findall(code)):
+            return []
+
+        rel_path = file_path.relative_to(self.codebase_path)
+        if self.extraction_cache is not None:
+            cached = self.extraction_cache.get_references(self.repo, rel_path, code, symbols)
+            if cached is not None:
+                return [
+                    (qualified_name_to_code_data[name], ref_type, file_path, line, column, text)
+                    for name, ref_type, line, column, text in cached
+                ]
+
+        _, tree = self.parse_cache.get_tree(file_path, self.language, source=code)
+        references = self._collect_references(file_path, tree.root_node, qualified_name_to_code_data)
+        if self.extraction_cache is not None:
+            self.extraction_cache.put_references(
+                self.repo,
+                rel_path,
+                code,
+                symbols,
+                [
+                    (f"{data.module}.{data.name}".lstrip("."), ref_type, line, column, text)
+                    for data, ref_type, _, line, column, text in references
+                ],
+            )
+        return references
+
     def _find_references_in_file(
         self,
         file_path: Path,
-        code: str,
         root_node: Node,
         qualified_name_to_code_data: dict[str, CodeData],
     ) -> None:
         """Find all references in a single file."""
+        self._add_references(self._collect_references(file_path, root_node, qualified_name_to_code_data))
+
+    def _collect_references(
+        self,
+        file_path: Path,
+        root_node: Node,
+        qualified_name_to_code_data: dict[str, CodeData],
+    ) -> list[FoundReference]:
+        """Collect the references found in a single file, in document order."""
 
         # First, extract imports to understand the context
-        imports_context = self._extract_imports_context(root_node)
+        if self.imports_context_provider:
+            # Copied, local symbols are added to it below
+            imports_context = dict(self.imports_context_provider(root_node))
+        else:
+            imports_context = self._extract_imports_context(root_node)
 
         # Add fake imports for locally defined symbols
-        for data in qualified_name_to_code_data.values():
-            if data.file_path == file_path.relative_to(self.codebase_path):
-                imports_context[data.name] = f"{data.module}.{data.name}"
+        imports_context.update(
+            self._local_symbols(qualified_name_to_code_data).get(file_path.relative_to(self.codebase_path), ())
+        )
+
+        # Resolutions only hold for a single imports context
+        self._state.resolve_cache = {}
 
-        def walk_node(node: Node) -> None:
-            # Check current node for references
-            self._check_node_for_references(node, file_path, code, qualified_name_to_code_data, imports_context)
+        references: list[FoundReference] = []
 
-            # Recursively check children
-            for child in node.children:
-                walk_node(child)
+        if self.identifier_kinds:
+            # Only nodes enclosing an identifier that could resolve can produce a reference
+            candidates = self._find_candidate_identifiers(root_node, qualified_name_to_code_data, imports_context)
+            nodes: Iterable[Node] = self._handled_nodes_enclosing(candidates)
+        else:
+            handlers = self._handlers_by_kind_id
+            # Most nodes have no handler, skip them before paying for a method call
+            nodes = (node for node in iter_tree(root_node) if node.kind_id in handlers)
 
-        walk_node(root_node)
+        for node in nodes:
+            references.extend(
+                self._check_node_for_references(node, file_path, qualified_name_to_code_data, imports_context)
+            )
+        return references
+
+    def _local_symbols(self, qualified_name_to_code_data: dict[str, CodeData]) -> dict[Path, list[tuple[str, str]]]:
+        """
+        (name, qualified name) imports of the lookup's symbols grouped by file, built once per lookup instead of
+        scanning all symbols and deriving their module for every file.
+        """
+        cached_lookup, local_symbols = self._state.local_symbols
+        if cached_lookup is not qualified_name_to_code_data:
+            local_symbols = {}
+            for data in qualified_name_to_code_data.values():
+                local_symbols.setdefault(data.file_path, []).append((data.name, f"{data.module}.{data.name}"))
+            self._state.local_symbols = (qualified_name_to_code_data, local_symbols)
+        return local_symbols
+
+    def _find_candidate_identifiers(
+        self,
+        root_node: Node,
+        qualified_name_to_code_data: dict[str, CodeData],
+        imports_context: dict[str, str],
+    ) -> list[Node]:
+        """
+        Identifier tokens that can begin a resolvable name: the first segment of a qualified name,
+        or an imported name pointing to one. Collected with a single query over the file.
+        """
+        cached_lookup, heads = self._state.qualified_heads
+        if cached_lookup is not qualified_name_to_code_data:
+            heads = frozenset(name.partition(".")[0].encode() for name in qualified_name_to_code_data)
+            self._state.qualified_heads = (qualified_name_to_code_data, heads)
+        imported = {
+            name.encode()
+            for name, qualified_name in imports_context.items()
+            if qualified_name in qualified_name_to_code_data
+        }
+
+        query = self._get_query("[" + " ".join(f"({kind})" for kind in self.identifier_kinds) + "] @identifier")
+        return [
+            node
+            for node in query.captures(root_node).get("identifier", [])
+            if node.text in heads or node.text in imported
+        ]
+
+    def _handled_nodes_enclosing(self, identifiers: list[Node]) -> list[Node]:
+        """Nodes with a handler that are ancestors of (or are) the given identifiers, in document order."""
+        handlers = self._handlers_by_kind_id
+        visited: set[int] = set()
+        found: list[tuple[tuple[int, int, int], Node]] = []
+        for identifier in identifiers:
+            node: Node | None = identifier
+            height = 0
+            # Ancestors of an already visited node have been visited too
+            while node is not None and node.id not in visited:
+                visited.add(node.id)
+                if node.kind_id in handlers:
+                    # Pre-order: by start, then outermost first, then parents before same-range children
+                    found.append(((node.start_byte, -node.end_byte, -height), node))
+                node, height = node.parent, height + 1
+
+        found.sort(key=lambda item: item[0])
+        return [node for _, node in found]
+
+    def _add_references(
+        self, references: list[FoundReference], seen: dict[int, set[ReferenceKey]] | None = None
+    ) -> None:
+        """
+        Append references to their targets, keeping a single reference of each type per line.
+        `seen` maps each target (by id) to the keys of its references, and is shared by the files of a run.
+        ReferenceData models are only built, and their text only decoded, for the references that are kept.
+        """
+        if seen is None:
+            seen = {}
+        for data, ref_type, file_path, line, column, text in references:
+            keys = seen.get(id(data))
+            if keys is None:
+                keys = seen[id(data)] = {(ref.type, ref.file, ref.line) for ref in data.references}
+
+            # For now, assume all references with matching names are relevant
+            # TODO add more sophisticated disambiguation for objects sharing a name, such as:
+            # - Checking import paths
+            # - Analyzing module structure
+            # - Using qualified names
+
+            # Avoid multiple references of the same type at the same line
+            key = (ref_type, file_path, line)
+            if key in keys:
+                continue
+            keys.add(key)
+            data.references.append(
+                ReferenceData(type=ref_type, file=file_path, line=line, column=column, text=text.decode().strip())
+            )
+
+    def _get_query(self, source: str) -> Query:
+        return get_thread_query(self.language, source)
 
     @abstractmethod
     def _extract_imports_context(self, root_node: Node) -> dict[str, str]:
@@ -75,35 +299,27 @@ class ReferenceDetector(ABC):
         self,
         node: Node,
         file_path: Path,
-        code: str,
         qualified_name_to_code_data: dict[str, CodeData],
         imports_context: dict[str, str],
-    ) -> None:
-        """Check a specific node for references and add them to the appropriate CodeData objects."""
-        handler_tuple = self.node_handlers.get(node.type)
-        if not handler_tuple:
+    ) -> Iterator[FoundReference]:
+        """Check a node whose kind has a handler for references to CodeData objects."""
+        handler_func, ref_type = self._handlers_by_kind_id[node.kind_id]
+        targets: list[CodeData] = [
+            data for data in handler_func(node, qualified_name_to_code_data, imports_context) if data
+        ]
+        if not ref_type or not targets:
             return
 
-        handler_func, ref_type = handler_tuple
-        for data in handler_func(node, qualified_name_to_code_data, imports_context):
-            if ref_type and data:
-                line, column = self._get_line_column(node, code)
-                reference = ReferenceData(
-                    type=ref_type,
-                    file=file_path,
-                    line=line,
-                    column=column,
-                    text=node.text.decode().strip(),
-                )
-                if self._is_relevant_reference(data, reference):
-                    data.references.append(reference)
-
-    def _get_line_column(self, node: Node, code: str) -> tuple[int, int]:
-        """Get line and column numbers for a node (1-indexed)"""
-        lines_before = code[: node.start_byte].count("\n")
-        line_start = code.rfind("\n", 0, node.start_byte) + 1
-        column = node.start_byte - line_start
-        return lines_before + 1, column + 1
+        # Shared by every reference this node produces
+        line, column = self._get_line_column(node)
+        text = node_text(node)
+        for data in targets:
+            yield data, ref_type, file_path, line, column, text
+
+    def _get_line_column(self, node: Node) -> tuple[int, int]:
+        """Get line and column numbers for a node (1-indexed), as already computed by the parser"""
+        row, column = node.start_point
+        return row + 1, column + 1
 
     def _resolve_reference_target(
         self,
@@ -111,34 +327,20 @@ class ReferenceDetector(ABC):
         qualified_name_to_code_data: dict[str, CodeData],
         imports_context: dict[str, str],
     ) -> CodeData | None:
-        """Resolve an identifier to the appropriate CodeData object."""
+        """Resolve an identifier to the appropriate CodeData object, memoized for the current file."""
+        resolve_cache = self._state.resolve_cache
+        if identifier in resolve_cache:
+            return resolve_cache[identifier]
+
+        code_data = None
         # 1. Try exact qualified match first
         if identifier in qualified_name_to_code_data:
-            return qualified_name_to_code_data[identifier]
+            code_data = qualified_name_to_code_data[identifier]
 
         # 2. Check if it's imported with a qualified name
-        if identifier in imports_context:
+        elif identifier in imports_context:
             qualified_name = imports_context[identifier]
-            if qualified_name in qualified_name_to_code_data:
-                return qualified_name_to_code_data[qualified_name]
-            return None
-        return None
+            code_data = qualified_name_to_code_data.get(qualified_name)
 
-    def _is_relevant_reference(self, data: CodeData, reference: ReferenceData) -> bool:
-        """
-        Determine if a reference is relevant to a specific CodeData object.
-        This helps with disambiguation when multiple objects have the same name.
-        """
-        # For now, assume all references with matching names are relevant
-        # TODO add more sophisticated logic here, such as:
-        # - Checking import paths
-        # - Analyzing module structure
-        # - Using qualified names
-
-        # Avoid multiple references of the same type at the same line
-        existing = [
-            ref
-            for ref in data.references
-            if ref.type == reference.type and ref.file == reference.file and ref.line == reference.line
-        ]
-        return not existing
+        resolve_cache[identifier] = code_data
+        return code_data
@@ -0,0 +1,68 @@
+import threading
+from collections.abc import Iterator
+from functools import cache
+from typing import cast
+
+from tree_sitter import Node, Parser, Query
+from tree_sitter_language_pack import SupportedLanguage, get_language, get_parser
+
+_thread_local = threading.local()
+
+
+@cache
+def get_query(language: SupportedLanguage, source: str) -> Query:
+    """Compile a tree-sitter query once per (language, source) pair."""
+    return Query(get_language(language), source)
+
+
+def get_thread_query(language: SupportedLanguage, source: str) -> Query:
+    """
+    Compile a tree-sitter query once per (language, source) pair and thread. A Query keeps its own cursor
+    state, so concurrent workers cannot share one, but each thread reuses it across files and detectors.
+    """
+    queries: dict[tuple[SupportedLanguage, str], Query] = _thread_local.__dict__.setdefault("queries", {})
+    key = (language, source)
+    if key not in queries:
+        queries[key] = Query(get_language(language), source)
+    return queries[key]
+
+
+def get_thread_parser(language: SupportedLanguage) -> Parser:
+    """Return the parser of a language owned by the calling thread, parsers are not safe to share."""
+    parsers: dict[SupportedLanguage, Parser] = _thread_local.__dict__.setdefault("parsers", {})
+    if language not in parsers:
+        parsers[language] = get_parser(language)
+    return parsers[language]
+
+
+@cache
+def get_kind_ids(language: SupportedLanguage, *kinds: str) -> frozenset[int]:
+    """
+    Resolve node type names to the grammar's integer kind ids, so hot loops compare `node.kind_id`
+    instead of building a `node.type` string per node. A name can map to several ids (named and
+    anonymous nodes, aliases), all of which are included to keep the same semantics as comparing types.
+    """
+    lang = get_language(language)
+    return frozenset(kind_id for kind_id in range(lang.node_kind_count) if lang.node_kind_for_id(kind_id) in kinds)
+
+
+def node_text(node: Node | None) -> bytes:
+    """
+    Return the source of a node, empty for a missing field node. `Node.text` is only None for trees
+    parsed without their source, which the indexer never does.
+    """
+    return (node.text or b"") if node else b""
+
+
+def iter_tree(node: Node) -> Iterator[Node]:
+    """Yield a node and all its descendants in pre-order, driving a TreeCursor instead of recursing."""
+    cursor = node.walk()
+    while True:
+        # Only None for a cursor that is not on any node, which never happens while walking
+        yield cast("Node", cursor.node)
+        if cursor.goto_first_child():
+            continue
+        # The cursor cannot move above the node it was created from
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return
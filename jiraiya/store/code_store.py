@@ -1,16 +1,27 @@
-import json
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
 from fastembed import TextEmbedding
+from numpy.typing import NDArray
+from pydantic import TypeAdapter
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Record, ScoredPoint, models
+from qdrant_client.http.models import ExtendedPointId, Record, ScoredPoint, models
 from qdrant_client.models import FieldCondition, Filter, MatchValue, PointStruct
 
-from jiraiya.domain.data import CodeData, SearchResult, TextData
+from jiraiya.domain.data import CodeData, ReferenceData, SearchResult, TextData
 from jiraiya.store.utils import calculate_id
 
+# Points embedded and sent to Qdrant per request by the batch methods
+UPSERT_BATCH_SIZE = 64
+
+# Points fetched per scroll request when iterating over the collection
+SCROLL_PAGE_SIZE = 1024
+
+# Serializes references straight to JSON, without building intermediate dicts
+_REFERENCES = TypeAdapter(list[ReferenceData])
+
 
 class CodeVectorStore:
     def __init__(
@@ -23,12 +34,17 @@ class CodeVectorStore:
         port: int = 6333,
     ) -> None:
         self.code_encoder = self._load_model(code_encoder, cache_dir)
-        self.text_encoder = self._load_model(text_encoder, cache_dir)
+        # The same model serves both vectors when configured for both, and each query is embedded once
+        self.text_encoder = (
+            self.code_encoder if text_encoder == code_encoder else self._load_model(text_encoder, cache_dir)
+        )
 
         self.tenant = tenant
         self.qdrant = QdrantClient(host=host, port=port)
 
         self.collection = f"{tenant}_class"
+        # Embeds the code vector of queries alongside the text one, started on the first query
+        self._query_executor: ThreadPoolExecutor | None = None
 
         self._ensure_collection(self.collection)
 
@@ -54,32 +70,44 @@ class CodeVectorStore:
             )
 
     def add_code(self, data: CodeData) -> None:
+        self.add_code_batch([data])
+
+    def add_code_batch(self, items: list[CodeData], batch_size: int = UPSERT_BATCH_SIZE) -> None:
+        """Embed and upsert code objects with one embedding call and one upsert request per batch."""
+        for start in range(0, len(items), batch_size):
+            batch = items[start : start + batch_size]
+            vectors = self.code_encoder.passage_embed([data.source_code for data in batch], batch_size=batch_size)
+            points = [self._code_point(data, vector) for data, vector in zip(batch, vectors, strict=True)]
+            self.qdrant.upsert(collection_name=self.collection, points=points)
+
+    def _code_point(self, data: CodeData, vector: NDArray) -> PointStruct:
         code = data.source_code
 
         metadata = data.model_dump(exclude={"source_code", "references"}, mode="json")
-        metadata["references"] = json.dumps([ref.model_dump(mode="json") for ref in data.references])
+        metadata["references"] = _REFERENCES.dump_json(data.references).decode()
         doc_id = calculate_id(content="code" + data.name, source=str(data.file_path))
 
-        point = PointStruct(
-            id=doc_id,
-            vector={"code": next(self.code_encoder.passage_embed([code]))},
-            payload={"text": code, **metadata},
-        )
-        self.qdrant.upsert(collection_name=self.collection, points=[point])
+        return PointStruct(id=doc_id, vector={"code": vector}, payload={"text": code, **metadata})
 
     def add_text(self, data: TextData) -> None:
+        self.add_text_batch([data])
+
+    def add_text_batch(self, items: list[TextData], batch_size: int = UPSERT_BATCH_SIZE) -> None:
+        """Embed and upsert text documents with one embedding call and one upsert request per batch."""
+        for start in range(0, len(items), batch_size):
+            batch = items[start : start + batch_size]
+            vectors = self.text_encoder.passage_embed([data.text for data in batch], batch_size=batch_size)
+            points = [self._text_point(data, vector) for data, vector in zip(batch, vectors, strict=True)]
+            self.qdrant.upsert(collection_name=self.collection, points=points)
+
+    def _text_point(self, data: TextData, vector: NDArray) -> PointStruct:
         text = data.text
         metadata = data.model_dump(exclude={"source_code"}, mode="json")
 
         # Unique id per name and file path of docs
         doc_id = calculate_id(content="text" + data.name, source=str(data.file_path))
 
-        point = PointStruct(
-            id=doc_id,
-            vector={"text": next(self.text_encoder.passage_embed([text]))},
-            payload={"text": text, **metadata},
-        )
-        self.qdrant.upsert(collection_name=self.collection, points=[point])
+        return PointStruct(id=doc_id, vector={"text": vector}, payload={"text": text, **metadata})
 
     def clear(self) -> None:
         self.qdrant.delete_collection(collection_name=self.collection)
@@ -94,8 +122,15 @@ class CodeVectorStore:
 
     def similarity_search(self, query: str, *, top_k: int = 5, **filters: Any) -> list[SearchResult]:
         query_filter = self._build_filter(**filters)
-        code_vector = next(self.code_encoder.query_embed(query))
-        text_vector = next(self.text_encoder.query_embed(query))
+        if self.text_encoder is self.code_encoder:
+            code_vector = text_vector = next(self.code_encoder.query_embed(query))
+        else:
+            # Inference releases the GIL, so the two models embed the query concurrently
+            if self._query_executor is None:
+                self._query_executor = ThreadPoolExecutor(max_workers=1)
+            code_future = self._query_executor.submit(lambda: next(self.code_encoder.query_embed(query)))
+            text_vector = next(self.text_encoder.query_embed(query))
+            code_vector = code_future.result()
 
         responses = self.qdrant.query_batch_points(
             collection_name=self.collection,
@@ -134,32 +169,34 @@ class CodeVectorStore:
     def find(
         self,
         *,
-        limit: int = 10,
+        limit: int = SCROLL_PAGE_SIZE,
         **filters: Any,
     ) -> Iterator[SearchResult]:
+        """Yield all points matching the filters, `limit` per request, fetching the next page in the background."""
         scroll_filter = self._build_filter(**filters)
-        offset = 0
-
-        while True:
-            response, next_page_offset = self.qdrant.scroll(
-                self.collection,
-                limit=limit,
-                offset=offset,
-                scroll_filter=scroll_filter,
-            )
 
-            if not response:
-                break
+        def scroll(offset: ExtendedPointId | None) -> tuple[list[Record], ExtendedPointId | None]:
+            return self.qdrant.scroll(self.collection, limit=limit, offset=offset, scroll_filter=scroll_filter)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = executor.submit(scroll, 0)
+            while True:
+                response, next_page_offset = page.result()
 
-            for hit in response:
-                yield self._parse_hit(hit)
+                if not response:
+                    break
 
-            offset = next_page_offset
+                # Request the next page while the current one is consumed
+                if next_page_offset:
+                    page = executor.submit(scroll, next_page_offset)
 
-            if not offset:
-                break
+                for hit in response:
+                    yield self._parse_hit(hit)
 
-    def get_all_repos(self, batch_size: int = 100) -> list[str]:
+                if not next_page_offset:
+                    break
+
+    def get_all_repos(self, batch_size: int = SCROLL_PAGE_SIZE) -> list[str]:
         unique_repos = set()
 
         for res in self.find(limit=batch_size):
@@ -170,3 +207,16 @@ class CodeVectorStore:
     def count(self) -> int:
         result = self.qdrant.count(self.collection)
         return result.count
+
+    def close(self) -> None:
+        """Stop the query executor and close the Qdrant client, the store cannot be used afterwards."""
+        if self._query_executor is not None:
+            self._query_executor.shutdown()
+            self._query_executor = None
+        self.qdrant.close()
+
+    def __enter__(self) -> "CodeVectorStore":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
@@ -0,0 +1,115 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from jiraiya.indexing.code_parser import CodeBaseParser
+from jiraiya.indexing.parse_cache import ParseCache
+
+
+@pytest.fixture
+def codebase(tmp_path: Path) -> Path:
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "module.py").write_text(
+        '''
+@first
+# comment between decorators
+@second(1)
+def standalone():
+    """Standalone docstring."""
+
+    def nested():
+        pass
+
+
+class MyClass:
+    """Class docstring."""
+
+    @staticmethod
+    def method():
+        pass
+''',
+        encoding="utf-8",
+    )
+    (tmp_path / "pkg" / "Service.kt").write_text(
+        """
+@MyAnnotation
+class Service {
+    fun method() {}
+}
+
+fun topLevel() {}
+""",
+        encoding="utf-8",
+    )
+    return tmp_path
+
+
+def test_extract_python_nodes(codebase: Path) -> None:
+    """Test extraction of classes and standalone functions with their decorators."""
+    parser = CodeBaseParser(codebase_path=codebase)
+    parser.source_files = [(codebase / "pkg" / "module.py", "python")]
+
+    data = {d.name: d for d in parser.extract_ast_nodes()}
+
+    assert set(data) == {"MyClass", "standalone", "nested"}
+    assert data["MyClass"].type == "class"
+    assert data["MyClass"].docstring == "Class docstring."
+    assert data["MyClass"].file_path == Path("pkg/module.py")
+    assert data["standalone"].type == "function"
+    assert data["standalone"].docstring == "Standalone docstring."
+    assert data["standalone"].source_code.startswith("@first\n@second(1)\ndef standalone():")
+    assert data["nested"].source_code == "def nested():\n        pass"
+
+
+def test_extract_kotlin_nodes(codebase: Path) -> None:
+    """Test extraction of Kotlin classes and top-level functions."""
+    parser = CodeBaseParser(codebase_path=codebase)
+    parser.source_files = [(codebase / "pkg" / "Service.kt", "kotlin")]
+
+    data = parser.extract_ast_nodes()
+
+    assert [(d.type, d.name) for d in data] == [("class", "Service"), ("function", "topLevel")]
+    assert data[0].source_code.startswith("@MyAnnotation\nclass Service {")
+
+
+def test_load_files_skips_ignored_directories(codebase: Path) -> None:
+    """Test that sources in the default blacklisted directories are not loaded, and other directories are."""
+    for directory in (".venv", "venv", ".git", "build"):
+        (codebase / directory).mkdir()
+        (codebase / directory / "generated.py").write_text("class Generated: ...", encoding="utf-8")
+
+    parser = CodeBaseParser(codebase_path=codebase)
+
+    assert sorted(path.relative_to(codebase) for path, _ in parser.source_files) == [
+        Path("build/generated.py"),
+        Path("pkg/Service.kt"),
+        Path("pkg/module.py"),
+    ]
+
+
+def test_extract_parses_each_file_once_beyond_cache_budget(codebase: Path) -> None:
+    """Test that files read ahead are extracted from the tree parsed ahead, even when the cache does not keep it."""
+    parser = CodeBaseParser(codebase_path=codebase, parse_cache=ParseCache(max_bytes=0))
+
+    with patch.object(parser.parse_cache, "get_tree", wraps=parser.parse_cache.get_tree) as get_tree:
+        data = parser.extract_ast_nodes()
+
+    assert {d.name for d in data} == {"standalone", "nested", "MyClass", "Service", "topLevel"}
+    assert sorted(call.args[0].relative_to(codebase) for call in get_tree.call_args_list) == [
+        Path("pkg/Service.kt"),
+        Path("pkg/module.py"),
+    ]
+
+
+def test_extract_nodes_with_multibyte_characters(tmp_path: Path) -> None:
+    """Test that node sources are sliced correctly when the file contains non-ASCII characters."""
+    source_file = tmp_path / "unicode.py"
+    source_file.write_text('GREETING = "héllo → wörld"\n\n\ndef greet():\n    """Say héllo."""\n', encoding="utf-8")
+    parser = CodeBaseParser(codebase_path=tmp_path)
+
+    data = parser.extract_ast_nodes()
+
+    assert len(data) == 1
+    assert data[0].source_code == 'def greet():\n    """Say héllo."""'
+    assert data[0].docstring == "Say héllo."
@@ -0,0 +1,78 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from jiraiya.domain.data import CodeData, ReferenceType
+from jiraiya.indexing.code_parser import CodeBaseParser
+from jiraiya.indexing.extraction_cache import ExtractionCache
+
+
+def test_get_returns_results_stored_for_the_same_content(tmp_path: Path) -> None:
+    """Test that results are returned for the content they were stored with, and survive reopening the cache."""
+    data = [CodeData(type="function", repo="project", file_path=Path("lib/a.py"), name="f", source_code="def f(): ...")]
+    cache = ExtractionCache(tmp_path / "cache.db")
+    cache.put("project", Path("lib/a.py"), b"def f(): ...\n", data)
+    cache.close()
+
+    cache = ExtractionCache(tmp_path / "cache.db")
+    assert cache.get("project", Path("lib/a.py"), b"def f(): ...\n") == data
+    assert cache.get("project", Path("lib/a.py"), b"def g(): ...\n") is None
+    assert cache.get("other", Path("lib/a.py"), b"def f(): ...\n") is None
+
+
+def test_unchanged_files_are_not_parsed_again(tmp_path: Path) -> None:
+    """Test that a second parser sharing the cache reuses the results of unchanged files only."""
+    codebase = tmp_path / "project"
+    codebase.mkdir()
+    (codebase / "a.py").write_text("class A: ...\n")
+    (codebase / "b.py").write_text("def b(): ...\n")
+    cache = ExtractionCache(tmp_path / "cache.db")
+    first = CodeBaseParser(codebase_path=codebase, extraction_cache=cache).extract_ast_nodes()
+
+    (codebase / "b.py").write_text("def b(): ...\n\n\ndef c(): ...\n")
+    parser = CodeBaseParser(codebase_path=codebase, extraction_cache=cache)
+    with patch.object(parser.parse_cache, "get_tree", wraps=parser.parse_cache.get_tree) as get_tree:
+        second = {d.name: d for d in parser.extract_ast_nodes()}
+
+    assert [call.args[0] for call in get_tree.call_args_list] == [codebase / "b.py"]
+    assert {d.name for d in first} == {"A", "b"}
+    assert set(second) == {"A", "b", "c"}
+    assert second["A"] == next(d for d in first if d.name == "A")
+
+
+def _index(parser: CodeBaseParser) -> dict[str, CodeData]:
+    return {d.name: d for d in parser.resolve_references(parser.extract_ast_nodes())}
+
+
+def test_unchanged_codebase_is_not_parsed_again(tmp_path: Path) -> None:
+    """Test that neither pass parses a file again when the codebase did not change, and references are reused."""
+    codebase = tmp_path / "project"
+    codebase.mkdir()
+    (codebase / "a.py").write_text("class A: ...\n")
+    (codebase / "b.py").write_text("from a import A\n\n\ndef b():\n    return A()\n")
+    cache = ExtractionCache(tmp_path / "cache.db")
+    first = _index(CodeBaseParser(codebase_path=codebase, extraction_cache=cache))
+
+    parser = CodeBaseParser(codebase_path=codebase, extraction_cache=cache)
+    with patch.object(parser.parse_cache, "get_tree", wraps=parser.parse_cache.get_tree) as get_tree:
+        second = _index(parser)
+
+    get_tree.assert_not_called()
+    assert [(ref.type, ref.text) for ref in first["A"].references] == [(ReferenceType.CALL, "A()")]
+    assert second == first
+
+
+def test_references_are_detected_again_when_symbols_change(tmp_path: Path) -> None:
+    """Test that cached references of an unchanged file are not reused once the codebase defines other symbols."""
+    codebase = tmp_path / "project"
+    codebase.mkdir()
+    (codebase / "a.py").write_text("class A: ...\n")
+    (codebase / "b.py").write_text("from a import A, B\n\n\ndef b():\n    return A(), B()\n")
+    cache = ExtractionCache(tmp_path / "cache.db")
+    first = _index(CodeBaseParser(codebase_path=codebase, extraction_cache=cache))
+
+    (codebase / "a.py").write_text("class A: ...\n\n\nclass B: ...\n")
+    second = _index(CodeBaseParser(codebase_path=codebase, extraction_cache=cache))
+
+    assert "B" not in first
+    assert [ref.text for ref in second["B"].references] == ["B()"]
+    assert second["A"].references == first["A"].references
@@ -0,0 +1,75 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from jiraiya.indexing.parse_cache import ParseCache
+
+
+def test_get_tree_reuses_tree_until_file_changes(tmp_path: Path) -> None:
+    """Test that a file is parsed once, and parsed again only after it changes on disk."""
+    source_file = tmp_path / "module.py"
+    source_file.write_text("def first(): ...\n")
+    cache = ParseCache()
+
+    code, tree = cache.get_tree(source_file, "python")
+    assert code == b"def first(): ...\n"
+    assert cache.get_tree(source_file, "python")[1] is tree
+
+    source_file.write_text("def second(): ...\n# changed\n")
+    stat = source_file.stat()
+    os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    code, changed_tree = cache.get_tree(source_file, "python")
+    assert changed_tree is not tree
+    name = changed_tree.root_node.children[0].child_by_field_name("name")
+    assert name is not None
+    assert name.text == b"second"
+
+
+def test_get_tree_keeps_earliest_trees_within_budget(tmp_path: Path) -> None:
+    """Test that trees beyond the byte budget are not cached, so a second pass in order reuses the first ones."""
+    files = []
+    for index in range(5):
+        files.append(tmp_path / f"module_{index}.py")
+        files[-1].write_text(f"value_{index} = 1\n")
+    cache = ParseCache(max_bytes=2 * files[0].stat().st_size)
+
+    first_pass = [cache.get_tree(file, "python")[1] for file in files]
+    second_pass = [cache.get_tree(file, "python")[1] for file in files]
+
+    assert [second is first for first, second in zip(first_pass, second_pass, strict=True)] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_get_tree_frees_budget_of_changed_files(tmp_path: Path) -> None:
+    """Test that an outdated tree no longer counts against the budget once its file is parsed again."""
+    source_file = tmp_path / "module.py"
+    source_file.write_text("value = 1\n")
+    cache = ParseCache(max_bytes=source_file.stat().st_size)
+    cache.get_tree(source_file, "python")
+
+    source_file.write_text("value = 2\n")
+    stat = source_file.stat()
+    os.utime(source_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    _, tree = cache.get_tree(source_file, "python")
+
+    assert cache.get_tree(source_file, "python")[1] is tree
+
+
+def test_get_tree_parses_given_source_without_reading_file(tmp_path: Path) -> None:
+    """Test that a source read by the caller is parsed and cached as is, without reading the file again."""
+    source_file = tmp_path / "module.py"
+    source_file.write_text("value = 1\n")
+    cache = ParseCache()
+    code = cache.get_source(source_file)
+
+    with patch.object(Path, "read_bytes", autospec=True, side_effect=Path.read_bytes) as read_bytes:
+        _, tree = cache.get_tree(source_file, "python", source=code)
+        assert cache.get_source(source_file) is code
+
+    read_bytes.assert_not_called()
+    assert cache.get_tree(source_file, "python")[1] is tree
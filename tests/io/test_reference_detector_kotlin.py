@@ -1,20 +1,41 @@
+from collections.abc import Callable, Mapping
 from pathlib import Path
+from types import MappingProxyType
 
 import pytest
+from tree_sitter import Tree
 from tree_sitter_language_pack import get_parser
 
 from jiraiya.domain.data import CodeData, ReferenceType
 from jiraiya.indexing.kotlin_reference_detector import KotlinReferenceDetector
 
+TEST_FILE = Path("test/test_file.kt")
+
 
 # Test fixtures and helper functions
-@pytest.fixture
-def detector() -> KotlinReferenceDetector:
-    return KotlinReferenceDetector(codebase_path=Path("test"), files=[])
+@pytest.fixture(scope="session")
+def parse_kotlin() -> Callable[[str], Tree]:
+    """Parse Kotlin snippets with a single parser, parsing each distinct snippet once per session."""
+    parser = get_parser("kotlin")
+    trees: dict[str, Tree] = {}
 
+    def parse(code: str) -> Tree:
+        if code not in trees:
+            trees[code] = parser.parse(code.encode())
+        return trees[code]
 
-@pytest.fixture
-def sample_code_data() -> dict[str, CodeData]:
+    return parse
+
+
+@pytest.fixture(scope="session")
+def detector(sample_imports_context: Mapping[str, str]) -> KotlinReferenceDetector:
+    return KotlinReferenceDetector(
+        codebase_path=Path("test"), files=[], imports_context_provider=lambda _: sample_imports_context
+    )
+
+
+@pytest.fixture(scope="session")
+def code_data_prototype() -> dict[str, CodeData]:
     return {
         "com.example.ParentClass": CodeData(
             type="class", repo="test", file_path=Path("com/example/test.kt"), name="ParentClass", source_code=""
@@ -41,469 +62,349 @@ def sample_code_data() -> dict[str, CodeData]:
 
 
 @pytest.fixture
-def sample_imports_context() -> dict[str, str]:
-    return {
-        "ParentClass": "com.example.ParentClass",
-        "MyClass": "com.example.MyClass",
-        "SomeClass": "com.example.lib.SomeClass",
-        "MyType": "com.example.MyType",
-        "MyAnnotation": "com.example.MyAnnotation",
-        "getMyClass": "com.example.getMyClass",
-        "MyInterface": "com.example.MyInterface",
-    }
-
-
-def test_class_inheritance_single_parent(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of single class inheritance in Kotlin."""
-
-    file_path = Path("test/test_file.kt")
-    code = """
+def sample_code_data(code_data_prototype: dict[str, CodeData]) -> dict[str, CodeData]:
+    """The shared code data, with the references found by previous tests cleared."""
+    for data in code_data_prototype.values():
+        data.references.clear()
+    return code_data_prototype
+
+
+@pytest.fixture(scope="session")
+def sample_imports_context() -> Mapping[str, str]:
+    # Read-only, as it is shared by every test
+    return MappingProxyType(
+        {
+            "ParentClass": "com.example.ParentClass",
+            "MyClass": "com.example.MyClass",
+            "SomeClass": "com.example.lib.SomeClass",
+            "MyType": "com.example.MyType",
+            "MyAnnotation": "com.example.MyAnnotation",
+            "getMyClass": "com.example.getMyClass",
+            "MyInterface": "com.example.MyInterface",
+        }
+    )
+
+
+# Snippets and the references they are expected to add, per target. Targets not listed get none.
+CASES = [
+    pytest.param(
+        """
 class ChildClass : ParentClass() {
 }
-    """
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    parent_data = sample_code_data["com.example.ParentClass"]
-    assert len(parent_data.references) == 2  # noqa: PLR2004
-    assert parent_data.references[0].type == ReferenceType.INHERITANCE
-    assert parent_data.references[0].text == "class ChildClass : ParentClass() {\n}"
-
-
-def test_class_inheritance_multiple_interfaces(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of class implementing multiple interfaces."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.ParentClass": [
+                (ReferenceType.INHERITANCE, "class ChildClass : ParentClass() {\n}"),
+                (ReferenceType.TYPE_ANNOTATION, "ParentClass"),
+            ],
+        },
+        id="class_inheritance_single_parent",
+    ),
+    pytest.param(
+        """
 class MyClass : ParentClass(), MyInterface {
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    # Should detect ParentClass reference
-    parent_data = sample_code_data["com.example.ParentClass"]
-    assert len(parent_data.references) == 2  # noqa: PLR2004
-    assert parent_data.references[0].type == ReferenceType.INHERITANCE
-    assert parent_data.references[0].text == "class MyClass : ParentClass(), MyInterface {\n}"
-
-    # Should detect MyInterface reference
-    interface_data = sample_code_data["com.example.MyInterface"]
-    assert len(interface_data.references) == 2  # noqa: PLR2004
-    assert interface_data.references[0].type == ReferenceType.INHERITANCE
-    assert parent_data.references[0].text == "class MyClass : ParentClass(), MyInterface {\n}"
-
-
-def test_class_inheritance_same_file(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of inheritance within the same file."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.ParentClass": [
+                (ReferenceType.INHERITANCE, "class MyClass : ParentClass(), MyInterface {\n}"),
+                (ReferenceType.TYPE_ANNOTATION, "ParentClass"),
+            ],
+            "com.example.MyInterface": [
+                (ReferenceType.INHERITANCE, "class MyClass : ParentClass(), MyInterface {\n}"),
+                (ReferenceType.TYPE_ANNOTATION, "MyInterface"),
+            ],
+        },
+        id="class_inheritance_multiple_interfaces",
+    ),
+    pytest.param(
+        """
 open class ParentClass {
 }
 
 class MyClass : ParentClass() {
 }
-"""
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    # Should detect ParentClass reference
-    parent_data = sample_code_data["com.example.ParentClass"]
-    assert len(parent_data.references) == 2  # noqa: PLR2004
-    assert parent_data.references[0].type == ReferenceType.INHERITANCE
-    assert parent_data.references[0].text == "class MyClass : ParentClass() {\n}"
-
-
-def test_function_call_simple(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of simple function calls."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+""",
+        {
+            "com.example.ParentClass": [
+                (ReferenceType.INHERITANCE, "class MyClass : ParentClass() {\n}"),
+                (ReferenceType.TYPE_ANNOTATION, "ParentClass"),
+            ],
+        },
+        id="class_inheritance_same_file",
+    ),
+    pytest.param(
+        """
 fun main() {
     MyClass()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["com.example.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.CALL
-    assert class_data.references[0].text == "MyClass()"
-
-
-def test_function_call_method_chaining(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of method chaining calls."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyClass": [(ReferenceType.CALL, "MyClass()")],
+        },
+        id="function_call_simple",
+    ),
+    pytest.param(
+        """
 fun main() {
     getMyClass().someMethod()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    function_data = sample_code_data["com.example.getMyClass"]
-    assert len(function_data.references) == 1
-    assert function_data.references[0].type == ReferenceType.CALL
-    assert function_data.references[0].text == "getMyClass()"
-
-
-def test_type_annotation_property(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of type annotations in property declarations."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.getMyClass": [(ReferenceType.CALL, "getMyClass()")],
+        },
+        id="function_call_method_chaining",
+    ),
+    pytest.param(
+        """
 class TestClass {
     val myProperty: MyType = MyType()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    type_data = sample_code_data["com.example.MyType"]
-    # Should find both type annotation and constructor call
-    assert len(type_data.references) == 2  # noqa: PLR2004
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "MyType"
-    assert type_data.references[1].type == ReferenceType.CALL
-    assert type_data.references[1].text == "MyType()"
-
-
-def test_type_annotation_function_parameter(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of type annotations in function parameters."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyType": [(ReferenceType.TYPE_ANNOTATION, "MyType"), (ReferenceType.CALL, "MyType()")],
+        },
+        id="type_annotation_property",
+    ),
+    pytest.param(
+        """
 fun processData(param: MyType): MyType {
     return param
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    type_data = sample_code_data["com.example.MyType"]
-    # Should find type annotations for both parameter and return type
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "MyType"
-
-
-def test_type_annotation_generic(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of generic type annotations."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyType": [(ReferenceType.TYPE_ANNOTATION, "MyType")],
+        },
+        id="type_annotation_function_parameter",
+    ),
+    pytest.param(
+        """
 fun processList(items: List<MyType>): List<MyType> {
     return items
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    type_data = sample_code_data["com.example.MyType"]
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "MyType"
-
-
-def test_attribute_access_property(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of property access."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyType": [(ReferenceType.TYPE_ANNOTATION, "MyType")],
+        },
+        id="type_annotation_generic",
+    ),
+    pytest.param(
+        """
 fun main() {
     val value = MyClass.staticProperty
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["com.example.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.ATTRIBUTE_ACCESS
-    assert class_data.references[0].text == "MyClass.staticProperty"
-
-
-def test_method_call_on_object(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of method calls on objects."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyClass": [(ReferenceType.ATTRIBUTE_ACCESS, "MyClass.staticProperty")],
+        },
+        id="attribute_access_property",
+    ),
+    pytest.param(
+        """
 fun main() {
     MyClass.staticMethod()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    # Should detect both function call and attribute access
-    class_data = sample_code_data["com.example.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.ATTRIBUTE_ACCESS
-    assert class_data.references[0].text == "MyClass.staticMethod"
-
-
-def test_annotation_simple(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of simple annotations."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyClass": [(ReferenceType.ATTRIBUTE_ACCESS, "MyClass.staticMethod")],
+        },
+        id="method_call_on_object",
+    ),
+    pytest.param(
+        """
 @MyAnnotation
 class TestClass {
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    annotation_data = sample_code_data["com.example.MyAnnotation"]
-    assert len(annotation_data.references) == 2  # noqa: PLR2004
-    assert annotation_data.references[0].type == ReferenceType.DECORATOR
-    assert annotation_data.references[0].text == "@MyAnnotation"
-
-
-def test_annotation_with_parameters(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of annotations with parameters."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyAnnotation": [
+                (ReferenceType.DECORATOR, "@MyAnnotation"),
+                (ReferenceType.TYPE_ANNOTATION, "MyAnnotation"),
+            ],
+        },
+        id="annotation_simple",
+    ),
+    pytest.param(
+        """
 @MyAnnotation("test")
 fun testFunction() {
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    annotation_data = sample_code_data["com.example.MyAnnotation"]
-    assert len(annotation_data.references) == 2  # noqa: PLR2004
-    assert annotation_data.references[0].type == ReferenceType.DECORATOR
-    assert annotation_data.references[0].text == '@MyAnnotation("test")'
-
-
-def test_assignment_property_initialization(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of assignment in property initialization."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyAnnotation": [
+                (ReferenceType.DECORATOR, '@MyAnnotation("test")'),
+                (ReferenceType.TYPE_ANNOTATION, "MyAnnotation"),
+            ],
+        },
+        id="annotation_with_parameters",
+    ),
+    pytest.param(
+        """
 class TestClass {
     val instance = MyClass()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["com.example.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.CALL
-    assert class_data.references[0].text == "MyClass()"
-
-
-def test_assignment_variable(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of assignment to variable."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyClass": [(ReferenceType.CALL, "MyClass()")],
+        },
+        id="assignment_property_initialization",
+    ),
+    pytest.param(
+        """
 fun main() {
     val myVar = MyClass()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["com.example.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.CALL
-    assert class_data.references[0].text == "MyClass()"
-
-
-def test_companion_object_access(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of companion object access."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyClass": [(ReferenceType.CALL, "MyClass()")],
+        },
+        id="assignment_variable",
+    ),
+    pytest.param(
+        """
 fun main() {
     val instance = MyClass.create()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["com.example.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.ATTRIBUTE_ACCESS
-    assert class_data.references[0].text == "MyClass.create"
-
-
-def test_extension_function_call(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of extension function usage."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyClass": [(ReferenceType.ATTRIBUTE_ACCESS, "MyClass.create")],
+        },
+        id="companion_object_access",
+    ),
+    pytest.param(
+        """
 fun main() {
     val obj = MyClass()
     obj.extensionMethod()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["com.example.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.CALL
-    assert class_data.references[0].text == "MyClass()"
-
-
-def test_no_reference_when_not_found(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test that no reference is created when identifier is not found."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyClass": [(ReferenceType.CALL, "MyClass()")],
+        },
+        id="extension_function_call",
+    ),
+    pytest.param(
+        """
 fun main() {
     UnknownClass()
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    # No references should be added to any CodeData objects
-    for code_data in sample_code_data.values():
-        assert len(code_data.references) == 0
-
-
-def test_when_expression_type_check(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of type references in when expressions."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {},
+        id="no_reference_when_not_found",
+    ),
+    pytest.param(
+        """
 fun processValue(obj: Any) {
     when (obj) {
         is MyType -> println("MyType")
         else -> println("Other")
     }
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    type_data = sample_code_data["com.example.MyType"]
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "MyType"
-
-
-def test_data_class_usage(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of data class constructor calls."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.kt")
-    code = """
+    """,
+        {
+            "com.example.MyType": [(ReferenceType.TYPE_ANNOTATION, "MyType")],
+        },
+        id="when_expression_type_check",
+    ),
+    pytest.param(
+        """
 fun main() {
     val data = MyType(field = "value")
 }
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
+    """,
+        {
+            "com.example.MyType": [(ReferenceType.CALL, 'MyType(field = "value")')],
+        },
+        id="data_class_usage",
+    ),
+    pytest.param(
+        """
+fun main() {
+    val lambda: (MyType) -> MyType = { param -> param }
+}
+    """,
+        {
+            "com.example.MyType": [(ReferenceType.TYPE_ANNOTATION, "MyType")],
+        },
+        id="lambda_with_type_annotation",
+    ),
+    pytest.param(
+        """
+// This is a comment that will create an unsupported node type
+/* Block comment */
+    """,
+        {},
+        id="unsupported_node_type",
+    ),
+]
+
+
+@pytest.mark.parametrize(("code", "expected"), CASES)
+def test_find_references(
+    detector: KotlinReferenceDetector,
+    sample_code_data: dict[str, CodeData],
+    parse_kotlin: Callable[[str], Tree],
+    code: str,
+    expected: dict[str, list[tuple[ReferenceType, str]]],
+) -> None:
+    """Test that references are detected with their type and text, in document order."""
+    node = parse_kotlin(code).root_node
+    detector._find_references_in_file(TEST_FILE, node, sample_code_data)
+
+    found = {
+        name: [(reference.type, reference.text) for reference in data.references]
+        for name, data in sample_code_data.items()
+        if data.references
+    }
+    assert found == expected
 
-    type_data = sample_code_data["com.example.MyType"]
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.CALL
-    assert type_data.references[0].text == 'MyType(field = "value")'
 
+class WalkingKotlinReferenceDetector(KotlinReferenceDetector):
+    """Kotlin detector without identifier kinds, dispatching handlers by walking every node."""
+
+    identifier_kinds = ()
 
-def test_lambda_with_type_annotation(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of type annotations in lambda expressions."""
-    detector._extract_imports_context = lambda _: sample_imports_context
 
-    file_path = Path("test/test_file.kt")
+def test_dispatch_modes_find_same_references(
+    sample_code_data: dict[str, CodeData],
+    sample_imports_context: Mapping[str, str],
+    parse_kotlin: Callable[[str], Tree],
+) -> None:
+    """Test that identifier-driven and walking dispatch find the same references in the same order."""
     code = """
-fun main() {
-    val lambda: (MyType) -> MyType = { param -> param }
+@MyAnnotation
+class ChildClass(val field: MyType) : ParentClass(), MyInterface {
+    val other: MyType = getMyClass()
+    fun run(param: SomeClass) = MyClass.create().field
 }
     """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
+    node = parse_kotlin(code).root_node
 
-    type_data = sample_code_data["com.example.MyType"]
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "MyType"
+    results = []
+    for detector_class in (KotlinReferenceDetector, WalkingKotlinReferenceDetector):
+        detector = detector_class(
+            codebase_path=Path("test"), files=[], imports_context_provider=lambda _: sample_imports_context
+        )
+        code_data = {name: data.model_copy(deep=True) for name, data in sample_code_data.items()}
+        detector._find_references_in_file(TEST_FILE, node, code_data)
+        results.append({name: data.references for name, data in code_data.items()})
 
+    assert any(results[0].values())
+    assert results[0] == results[1]
 
-def test_unsupported_node_type(
-    detector: KotlinReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test handling of unsupported node types."""
-    detector._extract_imports_context = lambda _: sample_imports_context
 
-    file_path = Path("test/test_file.kt")
+def test_extract_imports_context(detector: KotlinReferenceDetector, parse_kotlin: Callable[[str], Tree]) -> None:
+    """Test that imports are mapped from the parsed import headers, including aliases but not wildcards."""
     code = """
-// This is a comment that will create an unsupported node type
-/* Block comment */
-    """
-    node = get_parser("kotlin").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
+package com.example.app
+
+import com.example.ParentClass
+import com.example.MyClass as Alias
+import com.example.util.*
+"""
+    node = parse_kotlin(code).root_node
 
-    # No references should be added
-    for code_data in sample_code_data.values():
-        assert len(code_data.references) == 0
+    assert detector._extract_imports_context(node) == {
+        "ParentClass": "com.example.ParentClass",
+        "Alias": "com.example.MyClass",
+    }
@@ -1,43 +1,59 @@
+from collections.abc import Callable
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
+from tree_sitter import Tree
 from tree_sitter_language_pack import get_parser
 
 from jiraiya.domain.data import CodeData, ReferenceType
 from jiraiya.indexing.python_reference_detector import PythonReferenceDetector
 
+TEST_FILE = Path("test/test_file.py")
+
 
 # Test fixtures and helper functions
-@pytest.fixture
-def detector() -> PythonReferenceDetector:
-    return PythonReferenceDetector(codebase_path=Path("test"), files=[])
+@pytest.fixture(scope="session")
+def parse_python() -> Callable[[str], Tree]:
+    """Parse Python snippets with a single parser, parsing each distinct snippet once per session."""
+    parser = get_parser("python")
+    trees: dict[str, Tree] = {}
+
+    def parse(code: str) -> Tree:
+        if code not in trees:
+            trees[code] = parser.parse(code.encode())
+        return trees[code]
+
+    return parse
+
+
+@pytest.fixture(scope="session")
+def detector(sample_imports_context: dict[str, str]) -> PythonReferenceDetector:
+    return PythonReferenceDetector(
+        codebase_path=Path("test"), files=[], imports_context_provider=lambda _: sample_imports_context
+    )
+
+
+# Qualified name, type, name and file of the symbols the snippets can reference
+CODE_DATA_SPECS = (
+    ("module.ParentClass", "class", "ParentClass", Path("module/test.py")),
+    ("module.MyClass", "class", "MyClass", Path("module/test.py")),
+    ("lib.SomeClass", "class", "SomeClass", Path("lib/test.py")),
+    ("module.MyType", "class", "MyType", Path("module/test.py")),
+    ("module.my_decorator", "function", "my_decorator", Path("module/test.py")),
+    ("module.get_my_class", "function", "get_my_class", Path("module/test.py")),
+)
 
 
 @pytest.fixture
 def sample_code_data() -> dict[str, CodeData]:
     return {
-        "module.ParentClass": CodeData(
-            type="class", repo="test", file_path=Path("module/test.py"), name="ParentClass", source_code=""
-        ),
-        "module.MyClass": CodeData(
-            type="class", repo="test", file_path=Path("module/test.py"), name="MyClass", source_code=""
-        ),
-        "lib.SomeClass": CodeData(
-            type="class", repo="test", file_path=Path("lib/test.py"), name="SomeClass", source_code=""
-        ),
-        "module.MyType": CodeData(
-            type="class", repo="test", file_path=Path("module/test.py"), name="MyType", source_code=""
-        ),
-        "module.my_decorator": CodeData(
-            type="function", repo="test", file_path=Path("module/test.py"), name="my_decorator", source_code=""
-        ),
-        "module.get_my_class": CodeData(
-            type="function", repo="test", file_path=Path("module/test.py"), name="get_my_class", source_code=""
-        ),
+        qualified_name: CodeData(type=type_, repo="test", file_path=file_path, name=name, source_code="")
+        for qualified_name, type_, name, file_path in CODE_DATA_SPECS
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_imports_context() -> dict[str, str]:
     return {
         "ParentClass": "module.ParentClass",
@@ -49,332 +65,308 @@ def sample_imports_context() -> dict[str, str]:
     }
 
 
-def test_class_inheritance_single_parent(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of single class inheritance."""
-
-    file_path = Path("test/test_file.py")
-    code = """
+# Snippets and the references they are expected to add, per target. Targets not listed get none.
+CASES = [
+    pytest.param(
+        """
     class ChildClass(ParentClass):
         pass
-    """
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    parent_data = sample_code_data["module.ParentClass"]
-    assert len(parent_data.references) == 1
-    assert parent_data.references[0].type == ReferenceType.INHERITANCE
-    assert parent_data.references[0].text == code.strip()
-
-
-def test_class_inheritance_multiple_parents(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of multiple inheritance."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.ParentClass": [(ReferenceType.INHERITANCE, "class ChildClass(ParentClass):\n        pass")],
+        },
+        id="class_inheritance_single_parent",
+    ),
+    pytest.param(
+        """
     class Child(ParentClass, MixinClass):
         pass
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    # Should detect ParentClass reference
-    parent_data = sample_code_data["module.ParentClass"]
-    assert len(parent_data.references) == 1
-    assert parent_data.references[0].type == ReferenceType.INHERITANCE
-    assert parent_data.references[0].text == code.strip()
-
-
-def test_class_inheritance_same_file(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of multiple inheritance."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.ParentClass": [(ReferenceType.INHERITANCE, "class Child(ParentClass, MixinClass):\n        pass")],
+        },
+        id="class_inheritance_multiple_parents",
+    ),
+    pytest.param(
+        """
 class ParentClass:
     pass
 
 class MyClass(ParentClass):
     pass
-"""
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    # Should detect ParentClass reference
-    parent_data = sample_code_data["module.ParentClass"]
-    assert len(parent_data.references) == 1
-    assert parent_data.references[0].type == ReferenceType.INHERITANCE
-    assert parent_data.references[0].text == "class MyClass(ParentClass):\n    pass"
-
-
-def test_function_call_simple(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of simple function calls."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+""",
+        {
+            "module.ParentClass": [(ReferenceType.INHERITANCE, "class MyClass(ParentClass):\n    pass")],
+        },
+        id="class_inheritance_same_file",
+    ),
+    pytest.param(
+        """
     MyClass()
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["module.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.CALL
-    assert class_data.references[0].text == code.strip()
-
-
-def test_function_call_qualified(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of qualified function calls."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.MyClass": [(ReferenceType.CALL, "MyClass()")],
+        },
+        id="function_call_simple",
+    ),
+    pytest.param(
+        """
     lib.MyClass()
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    # Should find reference based on base name "lib"
-    # Since "lib" is not in our test data, no reference should be added
-    for code_data in sample_code_data.values():
-        assert len(code_data.references) == 0
-
-
-def test_type_annotation_simple(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of simple type annotations."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {},
+        id="function_call_qualified",
+    ),
+    pytest.param(
+        """
 def func(param: MyType):
     pass
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    type_data = sample_code_data["module.MyType"]
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "MyType"
-
-
-def test_type_annotation_generic(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of generic type annotations."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.MyType": [(ReferenceType.TYPE_ANNOTATION, "MyType")],
+        },
+        id="type_annotation_simple",
+    ),
+    pytest.param(
+        """
 def func(param: List[MyType]):
     pass
-    """
-
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    type_data = sample_code_data["module.MyType"]
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "List[MyType]"
-
-
-def test_type_annotation_annotated(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of generic type annotations."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.MyType": [(ReferenceType.TYPE_ANNOTATION, "List[MyType]")],
+        },
+        id="type_annotation_generic",
+    ),
+    pytest.param(
+        """
 def func(param: Annotated[MyType, Depends(get_my_class)]):
     pass
-    """
-
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    type_data = sample_code_data["module.MyType"]
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "Annotated[MyType, Depends(get_my_class)]"
-
-    type_data = sample_code_data["module.get_my_class"]
-    assert len(type_data.references) == 1
-    assert type_data.references[0].type == ReferenceType.TYPE_ANNOTATION
-    assert type_data.references[0].text == "Annotated[MyType, Depends(get_my_class)]"
-
-
-def test_attribute_access_simple(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of attribute access."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.MyType": [(ReferenceType.TYPE_ANNOTATION, "Annotated[MyType, Depends(get_my_class)]")],
+            "module.get_my_class": [(ReferenceType.TYPE_ANNOTATION, "Annotated[MyType, Depends(get_my_class)]")],
+        },
+        id="type_annotation_annotated",
+    ),
+    pytest.param(
+        """
     MyClass.attribute
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["module.MyClass"]
-    assert len(class_data.references) == 1
-    assert class_data.references[0].type == ReferenceType.ATTRIBUTE_ACCESS
-    assert class_data.references[0].text == code.strip()
-
-
-def test_method_access(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of simple identifier usage."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.MyClass": [(ReferenceType.ATTRIBUTE_ACCESS, "MyClass.attribute")],
+        },
+        id="attribute_access_simple",
+    ),
+    pytest.param(
+        """
     MyClass.run()
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    class_data = sample_code_data["module.MyClass"]
-    assert len(class_data.references) == 2  # noqa: PLR2004
-    assert class_data.references[0].type == ReferenceType.CALL
-    assert class_data.references[0].text == code.strip()
-    assert class_data.references[1].type == ReferenceType.ATTRIBUTE_ACCESS
-    assert class_data.references[1].text == "MyClass.run"
-
-
-def test_decorator_simple(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of simple decorators."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.MyClass": [(ReferenceType.CALL, "MyClass.run()"), (ReferenceType.ATTRIBUTE_ACCESS, "MyClass.run")],
+        },
+        id="method_access",
+    ),
+    pytest.param(
+        """
 @my_decorator
 def func():
     pass
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    decorator_data = sample_code_data["module.my_decorator"]
-    assert len(decorator_data.references) == 1
-    assert decorator_data.references[0].type == ReferenceType.DECORATOR
-    assert decorator_data.references[0].text == "@my_decorator"
-
-
-def test_decorator_with_parentheses(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of decorators with parentheses."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.my_decorator": [(ReferenceType.DECORATOR, "@my_decorator")],
+        },
+        id="decorator_simple",
+    ),
+    pytest.param(
+        """
 @my_decorator()
 def func():
     pass
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    decorator_data = sample_code_data["module.my_decorator"]
-    assert len(decorator_data.references) == 2  # noqa: PLR2004
-    assert decorator_data.references[0].type == ReferenceType.DECORATOR
-    assert decorator_data.references[0].text == "@my_decorator()"
-    assert decorator_data.references[1].type == ReferenceType.CALL
-    assert decorator_data.references[1].text == "my_decorator()"
-
-
-def test_assignment_identifier(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of assignment to identifier."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.my_decorator": [
+                (ReferenceType.DECORATOR, "@my_decorator()"),
+                (ReferenceType.CALL, "my_decorator()"),
+            ],
+        },
+        id="decorator_with_parentheses",
+    ),
+    pytest.param(
+        """
     var = MyClass
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    assigned_data = sample_code_data["module.MyClass"]
-    assert len(assigned_data.references) == 1
-    assert assigned_data.references[0].type == ReferenceType.ASSIGNMENT
-    assert assigned_data.references[0].text == code.strip()
-
-
-def test_assignment_call(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test detection of assignment to function call."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
+    """,
+        {
+            "module.MyClass": [(ReferenceType.ASSIGNMENT, "var = MyClass")],
+        },
+        id="assignment_identifier",
+    ),
+    pytest.param(
+        """
     var = MyClass()
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
+    """,
+        {
+            "module.MyClass": [(ReferenceType.ASSIGNMENT, "var = MyClass()"), (ReferenceType.CALL, "MyClass()")],
+        },
+        id="assignment_call",
+    ),
+    pytest.param(
+        """
+total += MyClass
+var: MyType
+""",
+        {
+            "module.MyClass": [(ReferenceType.ASSIGNMENT, "total += MyClass")],
+            "module.MyType": [(ReferenceType.TYPE_ANNOTATION, "MyType")],
+        },
+        id="assignment_augmented",
+    ),
+    pytest.param(
+        """
+    UnknownClass
+    """,
+        {},
+        id="no_reference_when_not_found",
+    ),
+    pytest.param(
+        """
+    # This is a comment that will create an unsupported node type
+    """,
+        {},
+        id="unsupported_node_type",
+    ),
+]
+
+
+@pytest.mark.parametrize(("code", "expected"), CASES)
+def test_find_references(
+    detector: PythonReferenceDetector,
+    sample_code_data: dict[str, CodeData],
+    parse_python: Callable[[str], Tree],
+    code: str,
+    expected: dict[str, list[tuple[ReferenceType, str]]],
+) -> None:
+    """Test that references are detected with their type and text, in document order."""
+    node = parse_python(code).root_node
+    detector._find_references_in_file(TEST_FILE, node, sample_code_data)
+
+    found = {
+        name: [(reference.type, reference.text) for reference in data.references]
+        for name, data in sample_code_data.items()
+        if data.references
+    }
+    assert found == expected
+
+
+def test_resolve_references_concurrently(tmp_path: Path) -> None:
+    """Test that files scanned by several workers yield the same references, in the same order, as one worker."""
+    files = []
+    for index in range(8):
+        file_path = tmp_path / f"user_{index}.py"
+        file_path.write_text(
+            "from lib.models import MyClass, ParentClass\n\n\n"
+            f"class Child{index}(ParentClass):\n"
+            f"    value = MyClass()\n"
+        )
+        files.append(file_path)
+
+    def resolve(max_workers: int) -> dict[str, CodeData]:
+        data = [
+            CodeData(type="class", repo="project", file_path=Path("lib/models.py"), name=name, source_code="")
+            for name in ("ParentClass", "MyClass")
+        ]
+        detector = PythonReferenceDetector(codebase_path=tmp_path, files=files)
+        detector.max_workers = max_workers
+        return detector.resolve_references(data)
+
+    sequential = resolve(1)
+    concurrent = resolve(4)
+
+    assert list(dict.fromkeys(ref.file for ref in sequential["lib.models.MyClass"].references)) == files
+    for name, data in sequential.items():
+        assert concurrent[name].references == data.references
+
+
+def test_resolve_references_updates_data_in_place(tmp_path: Path) -> None:
+    """Test that references are added to the given CodeData objects rather than to copies."""
+    file_path = tmp_path / "user.py"
+    file_path.write_text("from lib.models import MyClass\n\nvalue = MyClass()\n")
+    data = CodeData(type="class", repo="project", file_path=Path("lib/models.py"), name="MyClass", source_code="")
+
+    references = PythonReferenceDetector(codebase_path=tmp_path, files=[file_path]).resolve_references([data])
+
+    assert references["lib.models.MyClass"] is data
+    assert [ref.type for ref in data.references] == [ReferenceType.ASSIGNMENT, ReferenceType.CALL]
+
+
+def test_resolve_references_skips_files_without_symbol_names(tmp_path: Path) -> None:
+    """Test that files not mentioning any symbol name are not parsed."""
+    user_file = tmp_path / "user.py"
+    user_file.write_text("from lib.models import MyClass\n\nvalue = MyClass()\n")
+    unrelated_file = tmp_path / "unrelated.py"
+    unrelated_file.write_text("value = MyClassic()\n")
+    data = CodeData(type="class", repo="project", file_path=Path("lib/models.py"), name="MyClass", source_code="")
+
+    detector = PythonReferenceDetector(codebase_path=tmp_path, files=[user_file, unrelated_file])
+    with patch.object(detector.parse_cache, "get_tree", wraps=detector.parse_cache.get_tree) as get_tree:
+        detector.resolve_references([data])
+
+    assert [call.args[0] for call in get_tree.call_args_list] == [user_file]
+    assert {ref.file for ref in data.references} == {user_file}
+
+
+def test_reference_position_after_multibyte_characters(
+    detector: PythonReferenceDetector,
+    sample_code_data: dict[str, CodeData],
+    parse_python: Callable[[str], Tree],
+) -> None:
+    """Test that line and column numbers stay correct when preceding lines contain non-ASCII characters."""
 
-    some_data = sample_code_data["module.MyClass"]
-    assert len(some_data.references) == 2  # noqa: PLR2004
-    assert some_data.references[0].type == ReferenceType.ASSIGNMENT
-    assert some_data.references[0].text == code.strip()
-    assert some_data.references[1].type == ReferenceType.CALL
-    assert some_data.references[1].text == "MyClass()"
+    code = '"""Modulé doc → ünïcode."""\n\n\nclass ChildClass(ParentClass):\n    pass\n'
+    node = parse_python(code).root_node
+    detector._find_references_in_file(TEST_FILE, node, sample_code_data)
 
+    reference = sample_code_data["module.ParentClass"].references[0]
+    assert (reference.line, reference.column) == (4, 1)
 
-def test_no_reference_when_not_found(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
-) -> None:
-    """Test that no reference is created when identifier is not found."""
-    detector._extract_imports_context = lambda _: sample_imports_context
 
-    file_path = Path("test/test_file.py")
+def test_extract_imports_context(detector: PythonReferenceDetector, parse_python: Callable[[str], Tree]) -> None:
+    """Test that imports are mapped from the parsed import statements, including aliases and import lists."""
     code = """
-    UnknownClass
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
+import importlib.util
+import xml.etree.ElementTree as ET
+from .models import (
+    MyClass,  # a comment
+    MyType as Alias,
+)
+from lib \\
+    import SomeClass
+from module import *
+"""
+    node = parse_python(code).root_node
 
-    # No references should be added to any CodeData objects
-    for code_data in sample_code_data.values():
-        assert len(code_data.references) == 0
+    assert detector._extract_imports_context(node) == {
+        "util": "importlib.util",
+        "ET": "xml.etree.ElementTree",
+        "MyClass": ".models.MyClass",
+        "Alias": ".models.MyType",
+        "SomeClass": "lib.SomeClass",
+    }
 
 
-def test_unsupported_node_type(
-    detector: PythonReferenceDetector, sample_code_data: dict[str, CodeData], sample_imports_context: dict[str, str]
+def test_duplicate_references_are_skipped(
+    detector: PythonReferenceDetector,
+    sample_code_data: dict[str, CodeData],
+    parse_python: Callable[[str], Tree],
 ) -> None:
-    """Test handling of unsupported node types."""
-    detector._extract_imports_context = lambda _: sample_imports_context
-
-    file_path = Path("test/test_file.py")
-    code = """
-    # This is a comment that will create an unsupported node type
-    """
-    node = get_parser("python").parse(code.encode()).root_node
-    detector._find_references_in_file(file_path, code, node, sample_code_data)
-
-    # No references should be added
-    for code_data in sample_code_data.values():
-        assert len(code_data.references) == 0
+    """Test that a target keeps one reference per type and line, also across repeated scans of a file."""
+
+    code = "first, second = MyClass(), MyClass()\nthird = MyClass()\n"
+    node = parse_python(code).root_node
+    detector._find_references_in_file(TEST_FILE, node, sample_code_data)
+    detector._find_references_in_file(TEST_FILE, node, sample_code_data)
+
+    references = sample_code_data["module.MyClass"].references
+    assert [(ref.type, ref.line) for ref in references] == [
+        (ReferenceType.CALL, 1),
+        (ReferenceType.ASSIGNMENT, 2),
+        (ReferenceType.CALL, 2),
+    ]
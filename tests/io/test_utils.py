@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from tree_sitter import Node
+from tree_sitter_language_pack import get_parser
+
+from jiraiya.indexing.utils import get_kind_ids, get_thread_query, iter_tree
+
+
+def test_get_kind_ids_matches_node_types() -> None:
+    """Test that kind ids cover every node whose type has the given name, named or anonymous."""
+    root_node = get_parser("kotlin").parse(b"annotation class MyAnnotation\n@MyAnnotation class Foo").root_node
+    annotation_ids = get_kind_ids("kotlin", "annotation")
+
+    nodes = []
+    cursor = [root_node]
+    while cursor:
+        node = cursor.pop()
+        nodes.append(node)
+        cursor.extend(node.children)
+
+    matching = [node for node in nodes if node.kind_id in annotation_ids]
+    assert {node.is_named for node in matching} == {True, False}
+    assert matching == [node for node in nodes if node.type == "annotation"]
+    assert get_kind_ids("kotlin", "not_a_kotlin_node") == frozenset()
+
+
+def test_iter_tree_walks_subtree_in_pre_order() -> None:
+    """Test that iter_tree visits the same nodes as a recursive walk and stays within the starting node."""
+    root_node = get_parser("python").parse(b"class A:\n    def f(self):\n        return g(1)\n\nx = A()\n").root_node
+
+    def walk(node: Node) -> list[Node]:
+        return [node, *(descendant for child in node.children for descendant in walk(child))]
+
+    assert list(iter_tree(root_node)) == walk(root_node)
+    class_node = root_node.children[0]
+    assert list(iter_tree(class_node)) == walk(class_node)
+
+
+def test_get_thread_query_compiles_once_per_thread() -> None:
+    """Test that a thread reuses its compiled query, while another thread gets its own."""
+    query = get_thread_query("python", "(identifier) @identifier")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other = executor.submit(get_thread_query, "python", "(identifier) @identifier").result()
+
+    assert get_thread_query("python", "(identifier) @identifier") is query
+    assert other is not query
@@ -0,0 +1,141 @@
+import math
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+
+from jiraiya.domain.data import CodeData, ReferenceData, ReferenceType, TextData
+
+code_store = pytest.importorskip("jiraiya.store.code_store")
+
+
+class FakeEncoder:
+    """Embeds each text as its length, so vectors can be matched back to their documents."""
+
+    embedding_size = 2
+
+    def passage_embed(self, texts: list[str], batch_size: int) -> Iterator[list[float]]:
+        return ([float(len(text)), 1.0] for text in texts)
+
+    def query_embed(self, query: str) -> Iterator[list[float]]:
+        return iter([[float(len(query)), 1.0]])
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch) -> Any:
+    monkeypatch.setattr(code_store, "QdrantClient", MagicMock())
+    monkeypatch.setattr(code_store.CodeVectorStore, "_load_model", lambda _self, _model_id, _cache_dir: FakeEncoder())
+    return code_store.CodeVectorStore(tenant="project", code_encoder="code", text_encoder="text")
+
+
+@pytest.mark.parametrize("count", [1, 64, 65, 130])
+def test_add_code_batch_upserts_once_per_batch(store: Any, count: int) -> None:
+    """Test that code objects are upserted in batches of UPSERT_BATCH_SIZE, the last one holding the rest."""
+    items = [
+        CodeData(
+            type="function", repo="project", file_path=Path("lib/a.py"), name=f"f{i}", source_code=f"def f{i}(): ..."
+        )
+        for i in range(count)
+    ]
+    store.add_code_batch(items)
+
+    calls = store.qdrant.upsert.call_args_list
+    assert len(calls) == math.ceil(count / code_store.UPSERT_BATCH_SIZE)
+    assert [len(call.kwargs["points"]) for call in calls[:-1]] == [code_store.UPSERT_BATCH_SIZE] * (len(calls) - 1)
+    assert all(call.kwargs["collection_name"] == "project_class" for call in calls)
+
+    points = [point for call in calls for point in call.kwargs["points"]]
+    assert [point.payload["name"] for point in points] == [item.name for item in items]
+    assert [point.payload["text"] for point in points] == [item.source_code for item in items]
+    assert [point.vector for point in points] == [{"code": [float(len(item.source_code)), 1.0]} for item in items]
+    assert len({point.id for point in points}) == count
+
+
+@pytest.mark.parametrize("count", [1, 64, 65, 130])
+def test_add_text_batch_upserts_once_per_batch(store: Any, count: int) -> None:
+    """Test that text documents are upserted in batches of UPSERT_BATCH_SIZE, the last one holding the rest."""
+    items = [TextData(repo="project", file_path=Path("docs/a.md"), name=f"doc{i}", text="x" * i) for i in range(count)]
+    store.add_text_batch(items)
+
+    calls = store.qdrant.upsert.call_args_list
+    assert len(calls) == math.ceil(count / code_store.UPSERT_BATCH_SIZE)
+    assert [len(call.kwargs["points"]) for call in calls[:-1]] == [code_store.UPSERT_BATCH_SIZE] * (len(calls) - 1)
+
+    points = [point for call in calls for point in call.kwargs["points"]]
+    assert [point.payload["name"] for point in points] == [item.name for item in items]
+    assert [point.payload["text"] for point in points] == [item.text for item in items]
+    assert [point.vector for point in points] == [{"text": [float(len(item.text)), 1.0]} for item in items]
+
+
+def test_code_references_round_trip_through_payload(store: Any) -> None:
+    """Test that the references stored in a code payload load back into the same references."""
+    references = [
+        ReferenceData(type=ReferenceType.CALL, file=Path("lib/b.py"), line=3, column=4, text="f()"),
+        ReferenceData(type=ReferenceType.FROM_IMPORT, file=Path("lib/c.py"), line=1, column=0, text="from a import f"),
+    ]
+    data = CodeData(
+        type="function",
+        repo="project",
+        file_path=Path("lib/a.py"),
+        name="f",
+        source_code="def f(): ...",
+        references=references,
+    )
+    store.add_code(data)
+
+    (point,) = store.qdrant.upsert.call_args.kwargs["points"]
+    assert isinstance(point.payload["references"], str)
+    assert code_store._REFERENCES.validate_json(point.payload["references"]) == references
+    assert "source_code" not in point.payload
+
+
+def _records(*names: str) -> list[Any]:
+    return [
+        code_store.Record(id=i, payload={"file_path": "lib/a.py", "repo": "project", "name": name, "text": name})
+        for i, name in enumerate(names)
+    ]
+
+
+def test_find_yields_pages_in_order_until_last_offset(store: Any) -> None:
+    """Test that find scrolls page after page with the given limit, and stops at the page without a next offset."""
+    pages = {
+        0: (_records("a", "b"), 10),
+        10: (_records("c", "d"), 20),
+        20: (_records("e"), None),
+    }
+    store.qdrant.scroll.side_effect = lambda _collection, *, limit, offset, scroll_filter: pages[offset]
+
+    page_size = 2
+    results = list(store.find(limit=page_size, repo="project"))
+
+    assert [result.name for result in results] == ["a", "b", "c", "d", "e"]
+    calls = store.qdrant.scroll.call_args_list
+    assert [call.kwargs["offset"] for call in calls] == [0, 10, 20]
+    assert all(call.kwargs["limit"] == page_size for call in calls)
+    assert all(call.kwargs["scroll_filter"] == store._build_filter(repo="project") for call in calls)
+
+
+def test_find_yields_nothing_for_empty_collection(store: Any) -> None:
+    """Test that find stops after the first request when there are no matching points."""
+    store.qdrant.scroll.return_value = ([], None)
+
+    assert list(store.find()) == []
+    assert store.qdrant.scroll.call_count == 1
+    assert store.qdrant.scroll.call_args.kwargs["limit"] == code_store.SCROLL_PAGE_SIZE
+
+
+def test_closing_store_stops_query_executor_and_client(store: Any) -> None:
+    """Test that the executor started by a query is reused, and shut down with the client when the store closes."""
+    store.qdrant.query_batch_points.return_value = []
+
+    with store:
+        store.similarity_search("first")
+        executor = store._query_executor
+        store.similarity_search("second")
+        assert store._query_executor is executor
+
+    assert executor._shutdown
+    assert store._query_executor is None
+    store.qdrant.close.assert_called_once()